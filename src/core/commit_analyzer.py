@@ -6,10 +6,12 @@ change detection to provide a complete analysis of commits.
 """
 
 from typing import List, Dict, Optional, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
-from ..utils.github_api import get_file_content_before_after
+from ..utils.github_api import get_file_content_before_after, get_file_contents_bulk
 from ..core.git_analyzer import analyze_github_commit_metadata
+from ..utils.diff_utils import extract_content_from_patch
 from ..core.function_detector import create_modified_functions, detect_renamed_functions
 from ..models import CommitAnalysisResult, ModifiedFile, ModifiedFunction
 from ..parsers.tree_sitter_utils import SUPPORTED_LANGUAGES
@@ -17,13 +19,31 @@ from ..parsers.tree_sitter_utils import SUPPORTED_LANGUAGES
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Maximum number of files analyzed concurrently
+MAX_WORKERS = 8
 
-def analyze_commit_with_functions(commit_url: str) -> CommitAnalysisResult:
+# Languages with function detection support, as a set for fast lookups
+_SUPPORTED_LANGUAGES = frozenset(SUPPORTED_LANGUAGES)
+
+
+def analyze_commit_with_functions(
+    commit_url: str,
+    max_workers: int = MAX_WORKERS,
+    max_diff_lines: Optional[int] = None
+) -> CommitAnalysisResult:
     """
     Analyze a commit with function-level change detection.
     
+    Files are analyzed concurrently: fetching content is network-bound and
+    tree-sitter releases the GIL while parsing.
+    
     Args:
         commit_url: URL to a GitHub commit
+        max_workers: Maximum number of files analyzed concurrently; 1 analyzes
+            files sequentially in the calling thread
+        max_diff_lines: Optional budget of changed lines to analyze; when the
+            commit exceeds it, the largest files are left out of function
+            detection but still listed in modified_files
         
     Returns:
         CommitAnalysisResult with both file and function-level changes
@@ -34,52 +54,53 @@ def analyze_commit_with_functions(commit_url: str) -> CommitAnalysisResult:
     # Track all modified functions across files
     all_modified_functions = []
     
-    # Process each modified file to detect function changes
+    # Skip binary files and non-supported languages up front, so they never
+    # cost a content fetch or a worker
+    files_to_analyze = []
     for modified_file in commit_result.modified_files:
-        # Skip binary files and non-supported languages
-        if not should_analyze_file(modified_file):
-            logger.info(f"Skipping file: {modified_file.filename} (binary or unsupported language)")
-            continue
-        
-        # Get file content before and after changes
-        before_content, after_content = get_file_content_before_after(
-            commit_result.owner, commit_result.repo, commit_result.commit_sha, modified_file.filename
+        if should_analyze_file(modified_file):
+            files_to_analyze.append(modified_file)
+        else:
+            logger.info("Skipping file: %s (binary or unsupported language)", modified_file.filename)
+    
+    if max_diff_lines is not None:
+        files_to_analyze = _limit_diff_lines(files_to_analyze, max_diff_lines)
+    
+    # Patches of added and removed files hold the whole file, so those
+    # don't need to be downloaded
+    patch_contents = {}
+    for modified_file in files_to_analyze:
+        if modified_file.status in ('added', 'removed'):
+            content = extract_content_from_patch(modified_file.patch)
+            if content is not None:
+                if modified_file.status == 'added':
+                    patch_contents[modified_file.filename] = (None, content)
+                else:
+                    patch_contents[modified_file.filename] = (content, None)
+    
+    # Fetch the other file contents in batched requests where possible; files
+    # missing from the result are fetched individually by the workers
+    prefetched_contents = get_file_contents_bulk(
+        commit_result.owner, commit_result.repo, commit_result.commit_sha,
+        [(modified_file.filename, modified_file.status) for modified_file in files_to_analyze
+         if modified_file.filename not in patch_contents]
+    )
+    prefetched_contents.update(patch_contents)
+    
+    def analyze_file(modified_file: ModifiedFile) -> List[ModifiedFunction]:
+        return _analyze_modified_file(
+            commit_result, modified_file, prefetched_contents.get(modified_file.filename)
         )
-        
-        # Skip if we couldn't get content - with improved logic based on file status
-        if modified_file.status == 'added':
-            if not after_content:
-                logger.warning(f"Couldn't retrieve content for added file: {modified_file.filename}")
-                continue
-        elif modified_file.status == 'removed':
-            if not before_content:
-                logger.warning(f"Couldn't retrieve original content for removed file: {modified_file.filename}")
-                continue
-        else:  # modified, renamed
-            if not after_content:
-                logger.warning(f"Couldn't retrieve new content for: {modified_file.filename}")
-                continue
-            if not before_content:
-                logger.warning(f"Couldn't retrieve original content for: {modified_file.filename}")
-                continue
-        
-        # Detect function changes
-        try:
-            # Handle special cases based on file status
-            file_functions = create_modified_functions(
-                before_content, after_content, 
-                modified_file.language.lower(), 
-                modified_file.filename,
-                modified_file.patch,
-                modified_file.status,
-                )
-    
-            # Add file functions to the overall list
-            all_modified_functions.extend(file_functions)
-            
-        except Exception as e:
-            logger.error(f"Error analyzing functions in {modified_file.filename}: {str(e)}")
-            continue
+    
+    # Process each modified file to detect function changes, keeping file order
+    workers = min(max_workers, len(files_to_analyze))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for file_functions in executor.map(analyze_file, files_to_analyze):
+                all_modified_functions.extend(file_functions)
+    else:
+        for modified_file in files_to_analyze:
+            all_modified_functions.extend(analyze_file(modified_file))
     
     # Detect renamed functions across files
     detect_renamed_functions(all_modified_functions)
@@ -89,6 +110,98 @@ def analyze_commit_with_functions(commit_url: str) -> CommitAnalysisResult:
     return commit_result
 
 
+def _limit_diff_lines(files: List[ModifiedFile], max_diff_lines: int) -> List[ModifiedFile]:
+    """
+    Select files to analyze within a budget of changed lines.
+    
+    Files are admitted smallest first, so a few huge files (generated code,
+    vendored dependencies) are the ones left out.
+    
+    Args:
+        files: Files to choose from
+        max_diff_lines: Maximum total number of changed lines
+        
+    Returns:
+        The selected files, in their original order
+    """
+    if sum(modified_file.changes for modified_file in files) <= max_diff_lines:
+        return files
+    
+    selected = set()
+    used_lines = 0
+    for index in sorted(range(len(files)), key=lambda i: files[i].changes):
+        if used_lines + files[index].changes > max_diff_lines:
+            break
+        used_lines += files[index].changes
+        selected.add(index)
+    
+    for index, modified_file in enumerate(files):
+        if index not in selected:
+            logger.info("Skipping file: %s (%d changed lines exceed the diff line budget)",
+                        modified_file.filename, modified_file.changes)
+    
+    return [modified_file for index, modified_file in enumerate(files) if index in selected]
+
+
+def _analyze_modified_file(
+    commit_result: CommitAnalysisResult,
+    modified_file: ModifiedFile,
+    contents: Optional[Tuple[Optional[str], Optional[str]]] = None
+) -> List[ModifiedFunction]:
+    """
+    Detect function changes in a single modified file of a commit.
+    
+    Args:
+        commit_result: File-level analysis of the commit the file belongs to
+        modified_file: The file to analyze, already accepted by should_analyze_file
+        contents: Optional prefetched (content_before, content_after); fetched
+            from GitHub when not given
+        
+    Returns:
+        List of ModifiedFunction objects for the file (empty if skipped)
+    """
+    # Get file content before and after changes
+    if contents is not None:
+        before_content, after_content = contents
+    else:
+        before_content, after_content = get_file_content_before_after(
+            commit_result.owner, commit_result.repo, commit_result.commit_sha, modified_file.filename,
+            modified_file.status
+        )
+    
+    # Skip if we couldn't get content - with improved logic based on file status
+    if modified_file.status == 'added':
+        if not after_content:
+            logger.warning(f"Couldn't retrieve content for added file: {modified_file.filename}")
+            return []
+    elif modified_file.status == 'removed':
+        if not before_content:
+            logger.warning(f"Couldn't retrieve original content for removed file: {modified_file.filename}")
+            return []
+    else:  # modified, renamed
+        if not after_content:
+            logger.warning(f"Couldn't retrieve new content for: {modified_file.filename}")
+            return []
+        if not before_content:
+            logger.warning(f"Couldn't retrieve original content for: {modified_file.filename}")
+            return []
+    
+    # Detect function changes
+    try:
+        # Handle special cases based on file status
+        return create_modified_functions(
+            before_content, after_content, 
+            modified_file.language.lower(), 
+            modified_file.filename,
+            modified_file.patch,
+            modified_file.status,
+            )
+        
+    except Exception as e:
+        logger.error(f"Error analyzing functions in {modified_file.filename}: {str(e)}")
+        return []
+
+
 def should_analyze_file(modified_file: ModifiedFile) -> bool:
     """
     Determine if a file should be analyzed for function changes.
@@ -99,24 +212,27 @@ def should_analyze_file(modified_file: ModifiedFile) -> bool:
     Returns:
         True if the file should be analyzed, False otherwise
     """
+    # Fast path for the common case of a supported text file
+    patch = modified_file.patch
+    language = modified_file.language
+    if patch and patch.startswith('@@') and language and language.lower() in _SUPPORTED_LANGUAGES:
+        return True
+    
     # Skip binary files - GitHub API doesn't provide patches for binary files
     # and when it does provide a patch for text files, it starts with @@ for hunk headers
-    if not modified_file.patch:
-        logger.debug(f"Skipping file without patch: {modified_file.filename}")
+    if not patch:
+        logger.debug("Skipping file without patch: %s", modified_file.filename)
         return False
         
     # GitHub API patches always start with @@ for hunk headers for text files
-    if not modified_file.patch.startswith('@@'):
-        logger.debug(f"Skipping binary file (patch doesn't start with @@): {modified_file.filename}")
+    if not patch.startswith('@@'):
+        logger.debug("Skipping binary file (patch doesn't start with @@): %s", modified_file.filename)
         return False
         
     # Check if we support this language
-    if not modified_file.language:
-        logger.debug(f"Skipping file with unknown language: {modified_file.filename}")
+    if not language:
+        logger.debug("Skipping file with unknown language: %s", modified_file.filename)
         return False
     
-    if modified_file.language.lower() not in SUPPORTED_LANGUAGES:
-        logger.debug(f"Skipping file with unsupported language {modified_file.language}: {modified_file.filename}")
-        return False
-        
-    return True 
\ No newline at end of file
+    logger.debug("Skipping file with unsupported language %s: %s", language, modified_file.filename)
+    return False 
\ No newline at end of file
@@ -5,24 +5,48 @@ This module integrates diff parsing with function detection to identify
 changed functions in source code and analyze the nature of those changes.
 """
 
+from collections import OrderedDict
 from typing import List, Dict, Optional, Set, Tuple, Any, Union
 import logging
 import difflib
+import bisect
+import hashlib
+import threading
 from ..utils.diff_utils import (
     parse_github_patch,
     get_changed_line_numbers,
+    map_new_to_original_line,
     extract_function_diff,
+    index_function_diffs,
     FileDiff,
 )
 from ..parsers.function_parser import (
     parse_functions,
+    parse_functions_with_tree,
     extract_function_content,
 )
+from ..parsers.tree_sitter_utils import edit_tree
 from ..models import ModifiedFunction, FunctionChangeType
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# LRU cache of rename similarity scores keyed by the sha256 digests of the
+# normalized (added, deleted) contents, so pairs compared for a single file
+# aren't scored again when renames are detected across a whole commit
+SIMILARITY_CACHE_SIZE = 4096
+_similarities: "OrderedDict[Tuple[bytes, bytes], float]" = OrderedDict()
+_similarities_lock = threading.Lock()
+
+
+def clear_similarity_cache() -> None:
+    """
+    Clear the cache of rename similarity scores.
+    Useful for testing and managing memory.
+    """
+    with _similarities_lock:
+        _similarities.clear()
+
 
 def extract_functions_from_content(file_content: str, language: str, file_path: str = None) -> List[Dict]:
     """
@@ -139,10 +163,11 @@ def create_modified_functions(
     if file_status == "added":
         # New file - all functions are added
         new_functions = parse_functions(new_content, language)
+        new_lines = new_content.splitlines() if new_content else []
         result = []
         for func in new_functions:
             # Extract the function content
-            func_content = extract_function_content(new_content, func['start_line'], func['end_line'])
+            func_content = extract_function_content(new_content, func['start_line'], func['end_line'], new_lines)
             # Create a diff for added function (all lines prefixed with +)
             func_diff = '\n'.join([f"+{line}" for line in func_content.splitlines()])
             
@@ -160,10 +185,11 @@ def create_modified_functions(
     if file_status == "removed":
         # Deleted file - all functions are deleted
         orig_functions = parse_functions(original_content, language)
+        orig_lines = original_content.splitlines() if original_content else []
         result = []
         for func in orig_functions:
             # Extract the function content
-            func_content = extract_function_content(original_content, func['start_line'], func['end_line'])
+            func_content = extract_function_content(original_content, func['start_line'], func['end_line'], orig_lines)
             # Create a diff for deleted function (all lines prefixed with -)
             func_diff = '\n'.join([f"-{line}" for line in func_content.splitlines()])
             
@@ -187,6 +213,9 @@ def create_modified_functions(
     
     # If we don't have a patch but we have both contents, generate a diff
     elif original_content and new_content:
+        if original_content == new_content:
+            return []
+        
         # Generate a GitHub API style patch
         diff_lines = list(difflib.unified_diff(
             original_content.splitlines(),
@@ -230,13 +259,23 @@ def detect_modified_functions(
     Returns:
         List of ModifiedFunction objects
     """
-    # Parse functions in both versions
-    original_functions = parse_functions(original_content, language)
-    new_functions = parse_functions(new_content, language)
-    # Get changed line numbers from diff
+    # Parse functions in both versions, reparsing the new version
+    # incrementally from the original tree where possible
+    original_functions, original_tree = parse_functions_with_tree(original_content, language)
+    new_functions = parse_functions(new_content, language, _get_edited_tree(original_tree, original_content, new_content, file_diff))
+    original_by_name = _index_functions_by_name(original_functions)
+    # Split each version once for extracting function bodies
+    original_lines = original_content.splitlines() if original_content else []
+    new_lines = new_content.splitlines() if new_content else []
+    # Get changed line numbers from diff, sorted for range queries
     orig_changed_lines, new_changed_lines = get_changed_line_numbers(file_diff)
-    # Track detected functions
+    orig_changed_lines = sorted(orig_changed_lines)
+    new_changed_lines = sorted(new_changed_lines)
+    # Index the hunks once for extracting each changed function's diff
+    diff_index = index_function_diffs(file_diff)
+    # Track detected functions, and the original start lines they account for
     modified_functions = []
+    matched_original_starts = set()
     
     # First, find functions with changes in the new version
     for func in new_functions:
@@ -244,19 +283,26 @@ def detect_modified_functions(
         func_end = func['end_line']
         
         # Check if any changed lines overlap with this function
-        has_changes = any(func_start <= line <= func_end for line in new_changed_lines)
+        has_changes = _has_changes_in_range(new_changed_lines, func_start, func_end)
         
         if has_changes:
             # Find the corresponding function in the original version (if it exists)
-            original_func = _find_matching_function(func, original_functions)
+            original_func = _find_matching_function(func, original_by_name, file_diff)
             
             # Extract function content
-            new_func_content = extract_function_content(new_content, func['start_line'], func['end_line'])
+            new_func_content = extract_function_content(new_content, func['start_line'], func['end_line'], new_lines)
             
             if original_func:
                 # Modified function
-                original_func_content = extract_function_content(original_content, original_func['start_line'], original_func['end_line'])
-                func_diff = extract_function_diff(file_diff, func_start, func_end)
+                original_func_content = extract_function_content(original_content, original_func['start_line'], original_func['end_line'], original_lines)
+                
+                # Identical content means the changed lines only touched the
+                # function's range (line endings, a moved block), not the function
+                if original_func_content == new_func_content:
+                    matched_original_starts.add(original_func['start_line'])
+                    continue
+                
+                func_diff = extract_function_diff(file_diff, func_start, func_end, diff_index)
                 
                 # Create ModifiedFunction using the helper
                 modified_func = _create_modified_function(
@@ -270,6 +316,7 @@ def detect_modified_functions(
                     diff=func_diff
                 )
                 modified_functions.append(modified_func)
+                matched_original_starts.add(modified_func.original_start)
             else:
                 # New function (could also be a renamed function, but we'll detect that later)
                 # Create ModifiedFunction using the helper
@@ -278,22 +325,22 @@ def detect_modified_functions(
                     file_path=file_path,
                     change_type=FunctionChangeType.ADDED,
                     new_content=new_func_content,
-                    diff=extract_function_diff(file_diff, func_start, func_end)
+                    diff=extract_function_diff(file_diff, func_start, func_end, diff_index)
                 )
                 modified_functions.append(modified_func)
     
     # Find deleted functions (functions in original that don't match any new function)
     for orig_func in original_functions:
         # Skip if already matched
-        if any(mf.original_start == orig_func['start_line'] for mf in modified_functions if mf.original_start is not None):
+        if orig_func['start_line'] in matched_original_starts:
             continue
         
         # Check if this function includes any changed lines
-        has_changes = any(orig_func['start_line'] <= line <= orig_func['end_line'] for line in orig_changed_lines)
+        has_changes = _has_changes_in_range(orig_changed_lines, orig_func['start_line'], orig_func['end_line'])
         
         if has_changes:
             # This function was deleted
-            original_func_content = extract_function_content(original_content, orig_func['start_line'], orig_func['end_line'])
+            original_func_content = extract_function_content(original_content, orig_func['start_line'], orig_func['end_line'], original_lines)
             
             # Create a diff for deleted function (all lines prefixed with -)
             func_diff = '\n'.join([f"-{line}" for line in original_func_content.splitlines()])
@@ -307,6 +354,7 @@ def detect_modified_functions(
                 diff=func_diff
             )
             modified_functions.append(modified_func)
+            matched_original_starts.add(modified_func.original_start)
     
     return modified_functions
 
@@ -334,17 +382,45 @@ def detect_renamed_functions(modified_functions: List[ModifiedFunction]) -> None
     # Store potential matches with their similarity scores
     potential_matches = []
     
-    # Find potential renamed pairs
-    for added_idx, added_func in enumerate(added_functions):
-        for deleted_idx, deleted_func in enumerate(deleted_functions):
-            # Skip already processed functions
-            if added_idx in processed_added or deleted_idx in processed_deleted:
-                continue
-            
+    # Normalize the added functions once rather than once per pair
+    added_normalized = [_normalize_content(f.new_content) for f in added_functions]
+    added_tokens = [set(content.split()) for content in added_normalized]
+    added_digests = [_content_digest(content) for content in added_normalized]
+    
+    # Find potential renamed pairs. Each deleted function is compared against
+    # all added functions with one matcher, which indexes it only once
+    matcher = difflib.SequenceMatcher(None, autojunk=False)
+    for deleted_idx, deleted_func in enumerate(deleted_functions):
+        deleted_normalized = _normalize_content(deleted_func.original_content)
+        deleted_tokens = set(deleted_normalized.split())
+        deleted_digest = _content_digest(deleted_normalized)
+        matcher_ready = False
+        
+        for added_idx, added_func in enumerate(added_functions):
             # Calculate similarity between the function content
             # Only compare actual content, not diffs
             if added_func.new_content and deleted_func.original_content:
-                similarity = calculate_function_similarity(added_func.new_content, deleted_func.original_content)
+                if added_normalized[added_idx] and deleted_normalized:
+                    key = (added_digests[added_idx], deleted_digest)
+                    with _similarities_lock:
+                        similarity = _similarities.get(key)
+                        if similarity is not None:
+                            _similarities.move_to_end(key)
+                    
+                    if similarity is None:
+                        if not matcher_ready:
+                            matcher.set_seq2(deleted_normalized)
+                            matcher_ready = True
+                        matcher.set_seq1(added_normalized[added_idx])
+                        similarity = _bounded_similarity(
+                            matcher, _token_similarity(added_tokens[added_idx], deleted_tokens), 0.6
+                        )
+                        with _similarities_lock:
+                            _similarities[key] = similarity
+                            if len(_similarities) > SIMILARITY_CACHE_SIZE:
+                                _similarities.popitem(last=False)
+                else:
+                    similarity = 0.0
             else:
                 # Skip if we don't have the content to compare
                 logger.warning(f"Skipping similarity check for {added_func.name} and {deleted_func.name} - missing content")
@@ -360,8 +436,14 @@ def detect_renamed_functions(modified_functions: List[ModifiedFunction]) -> None
                     'similarity': similarity
                 })
     
-    # Sort matches by similarity score (highest first)
-    potential_matches.sort(key=lambda x: x['similarity'], reverse=True)
+    # Sort matches by similarity score (highest first), ties in added order
+    potential_matches.sort(key=lambda x: (-x['similarity'], x['added_idx'], x['deleted_idx']))
+    
+    # Positions of the added functions, and the deleted functions accounted
+    # for by renames, which are dropped in a single pass at the end
+    added_positions = {id(mf): i for i, mf in enumerate(modified_functions)
+                       if mf.change_type == FunctionChangeType.ADDED}
+    renamed_deleted = set()
     
     # Assign renames starting with the highest similarity matches
     for match in potential_matches:
@@ -375,38 +457,37 @@ def detect_renamed_functions(modified_functions: List[ModifiedFunction]) -> None
         added_func = match['added_func']
         deleted_func = match['deleted_func']
         
-        # Update the added function to be a renamed function
-        for i, mf in enumerate(modified_functions):
-            if mf is added_func:
-                # Favor same-file renames with a slight boost to similarity
-                same_file_boost = 0.1 if added_func.file == deleted_func.file else 0
-                actual_similarity = match['similarity'] + same_file_boost
-                
-                # Only consider it a rename if the similarity is high enough
-                if actual_similarity >= 0.7:  # Configurable threshold
-                    logger.info(f"Rename detected: {deleted_func.name} -> {added_func.name} " 
-                              f"(similarity: {actual_similarity:.2f})")
-                    
-                    # Create renamed function using helper
-                    modified_functions[i] = _create_modified_function(
-                        func_info={'name': added_func.name, 'node_type': added_func.type},
-                        file_path=added_func.file,
-                        change_type=FunctionChangeType.RENAMED,
-                        original_name=deleted_func.name,
-                        original_start=deleted_func.original_start,
-                        original_end=deleted_func.original_end,
-                        new_start=added_func.new_start,
-                        new_end=added_func.new_end,
-                        original_content=deleted_func.original_content,
-                        new_content=added_func.new_content,
-                        diff=added_func.diff
-                    )
-                    processed_added.add(added_idx)
-                    processed_deleted.add(deleted_idx)
-                    
-                    # Remove the deleted function as it's now accounted for
-                    modified_functions.remove(deleted_func)
-                break
+        # Favor same-file renames with a slight boost to similarity
+        same_file_boost = 0.1 if added_func.file == deleted_func.file else 0
+        actual_similarity = match['similarity'] + same_file_boost
+        
+        # Only consider it a rename if the similarity is high enough
+        if actual_similarity >= 0.7:  # Configurable threshold
+            logger.info("Rename detected: %s -> %s (similarity: %.2f)",
+                        deleted_func.name, added_func.name, actual_similarity)
+            
+            # Update the added function to be a renamed function
+            modified_functions[added_positions[id(added_func)]] = _create_modified_function(
+                func_info={'name': added_func.name, 'node_type': added_func.type},
+                file_path=added_func.file,
+                change_type=FunctionChangeType.RENAMED,
+                original_name=deleted_func.name,
+                original_start=deleted_func.original_start,
+                original_end=deleted_func.original_end,
+                new_start=added_func.new_start,
+                new_end=added_func.new_end,
+                original_content=deleted_func.original_content,
+                new_content=added_func.new_content,
+                diff=added_func.diff
+            )
+            processed_added.add(added_idx)
+            processed_deleted.add(deleted_idx)
+            
+            # The deleted function is now accounted for
+            renamed_deleted.add(id(deleted_func))
+    
+    if renamed_deleted:
+        modified_functions[:] = [mf for mf in modified_functions if id(mf) not in renamed_deleted]
 
 
 def calculate_function_similarity(content1: Optional[str], content2: Optional[str]) -> float:
@@ -424,56 +505,211 @@ def calculate_function_similarity(content1: Optional[str], content2: Optional[st
         return 0.0
     
     try:
-        # Split into lines
-        lines1 = content1.splitlines()
-        lines2 = content2.splitlines()
-        
-        # Join the lines
-        cleaned1 = '\n'.join(lines1)
-        cleaned2 = '\n'.join(lines2)
-        
         # Normalize whitespace
-        content1_norm = ' '.join(cleaned1.split())
-        content2_norm = ' '.join(cleaned2.split())
+        content1_norm = _normalize_content(content1)
+        content2_norm = _normalize_content(content2)
         
         # If after cleanup we have empty strings, return 0
         if not content1_norm or not content2_norm:
             return 0.0
         
-        # Use difflib to calculate sequence similarity
-        sequence_similarity = difflib.SequenceMatcher(None, content1_norm, content2_norm).ratio()
+        # Use difflib to calculate sequence similarity. Autojunk would treat
+        # every common character of content over 200 characters as junk
+        sequence_similarity = difflib.SequenceMatcher(None, content1_norm, content2_norm, autojunk=False).ratio()
         
-        # Calculate token-level similarity (split by whitespace)
-        tokens1 = set(content1_norm.split())
-        tokens2 = set(content2_norm.split())
-        
-        # Jaccard similarity for tokens
-        common_tokens = tokens1.intersection(tokens2)
-        all_tokens = tokens1.union(tokens2)
-        
-        token_similarity = len(common_tokens) / len(all_tokens) if all_tokens else 0.0
-        
-        # Combined similarity (weighted average)
-        return 0.7 * sequence_similarity + 0.3 * token_similarity
+        # Combine with token-level similarity (split by whitespace)
+        token_similarity = _token_similarity(set(content1_norm.split()), set(content2_norm.split()))
+        return _combine_similarity(sequence_similarity, token_similarity)
     except Exception as e:
         # Log the error but don't crash
         logger.warning(f"Error calculating function similarity: {str(e)}")
         return 0.0
 
 
-def _find_matching_function(func: Dict, candidates: List[Dict]) -> Optional[Dict]:
+def _get_edited_tree(
+    original_tree: Optional[Any],
+    original_content: str,
+    new_content: str,
+    file_diff: FileDiff
+) -> Optional[Any]:
+    """
+    Edit the parse tree of the original content by the diff hunks,
+    for incrementally parsing the new content.
+    
+    Args:
+        original_tree: Parse tree of the original content owned by the
+            caller, or None if it wasn't parsed
+        original_content: Content of the original file
+        new_content: Content of the new file
+        file_diff: Parsed file diff between the two versions
+        
+    Returns:
+        The original tree, edited in place, or None if there is no tree or
+        the hunks don't match the contents
+    """
+    if original_tree is None or not new_content or not file_diff.hunks:
+        return None
+    
+    # Hunk headers are 1-indexed, except that an empty range starts after the given line
+    line_edits = [
+        (header.original_start - (1 if header.original_count else 0), header.original_count,
+         header.new_start - (1 if header.new_count else 0), header.new_count)
+        for header, _ in file_diff.hunks
+    ]
+    return edit_tree(original_tree, original_content.encode('utf8'), new_content.encode('utf8'), line_edits)
+
+
+def _normalize_content(content: Optional[str]) -> str:
+    """Collapse all whitespace in function content to single spaces."""
+    return ' '.join(content.split()) if content else ''
+
+
+def _content_digest(content: str) -> bytes:
+    """Get the sha256 digest of normalized function content."""
+    return hashlib.sha256(content.encode('utf8')).digest()
+
+
+def _token_similarity(tokens1: Set[str], tokens2: Set[str]) -> float:
+    """Jaccard similarity of two sets of whitespace-separated tokens."""
+    all_tokens = len(tokens1 | tokens2)
+    return len(tokens1 & tokens2) / all_tokens if all_tokens else 0.0
+
+
+def _combine_similarity(sequence_similarity: float, token_similarity: float) -> float:
+    """Combine sequence and token similarity (weighted average)."""
+    return 0.7 * sequence_similarity + 0.3 * token_similarity
+
+
+def _bounded_similarity(matcher: difflib.SequenceMatcher, token_similarity: float, threshold: float) -> float:
+    """
+    Calculate the similarity of a matcher's sequences, giving up early when
+    it can't exceed a threshold.
+    
+    The cheap upper bounds real_quick_ratio (lengths only) and quick_ratio
+    (character counts) are tried before the expensive ratio.
+    
+    Args:
+        matcher: SequenceMatcher holding the two normalized contents
+        token_similarity: Token similarity of the two contents
+        threshold: Similarity that must be exceeded to be of interest
+        
+    Returns:
+        Similarity score between 0 and 1, or 0.0 if it can't exceed threshold
+    """
+    if _combine_similarity(matcher.real_quick_ratio(), token_similarity) <= threshold:
+        return 0.0
+    if _combine_similarity(matcher.quick_ratio(), token_similarity) <= threshold:
+        return 0.0
+    return _combine_similarity(matcher.ratio(), token_similarity)
+
+
+def _index_functions_by_name(functions: List[Dict]) -> Dict[str, Tuple[List[int], List[Dict]]]:
+    """
+    Group functions by name, ordered by start line.
+    
+    Args:
+        functions: List of function dicts
+        
+    Returns:
+        Dictionary mapping each function name to a tuple of (start lines,
+        functions) for the functions with that name, both sorted by start line
+    """
+    grouped = {}
+    for func in functions:
+        grouped.setdefault(func['name'], []).append(func)
+    
+    index = {}
+    for name, funcs in grouped.items():
+        funcs.sort(key=lambda f: f['start_line'])
+        index[name] = ([f['start_line'] for f in funcs], funcs)
+    return index
+
+
+def _find_matching_function(
+    func: Dict,
+    candidates_by_name: Dict[str, Tuple[List[int], List[Dict]]],
+    file_diff: Optional[FileDiff] = None
+) -> Optional[Dict]:
     """
     Find matching function in a list of candidate functions.
     
+    When several candidates share the function's name (overloads, methods of
+    different classes), the one starting closest to the function's line wins.
+    
     Args:
         func: Function to find a match for
-        candidates: List of candidate functions
+        candidates_by_name: Candidate functions indexed by name
+            (see _index_functions_by_name)
+        file_diff: Diff between the candidates' file and the function's file,
+            used to compare start lines in the candidates' line numbers
         
     Returns:
         Matching function dict or None if no match found
     """
-    # Use next() with a default of None to find exact name match
-    return next((candidate for candidate in candidates if candidate['name'] == func['name']), None)
+    entry = candidates_by_name.get(func['name'])
+    if not entry:
+        return None
+    
+    starts, candidates = entry
+    if len(candidates) == 1:
+        return candidates[0]
+    
+    # Lines added or removed above the function shift its start line,
+    # so compare positions in the original file
+    start_line = func['start_line']
+    if file_diff is not None:
+        start_line = _map_to_original_position(file_diff, start_line)
+    
+    # Pick the nearest neighbour around the insertion point
+    idx = bisect.bisect_left(starts, start_line)
+    if idx == 0:
+        return candidates[0]
+    if idx == len(starts):
+        return candidates[-1]
+    before, after = starts[idx - 1], starts[idx]
+    if start_line - before <= after - start_line:
+        return candidates[idx - 1]
+    return candidates[idx]
+
+
+def _map_to_original_position(file_diff: FileDiff, new_line: int) -> int:
+    """
+    Map a new file line to its position in the original file.
+    
+    Unlike map_new_to_original_line, added lines are mapped too, to the
+    corresponding position within their hunk in the original file.
+    
+    Args:
+        file_diff: The file diff
+        new_line: Line number in the new file
+        
+    Returns:
+        Line number in the original file
+    """
+    original_line = map_new_to_original_line(file_diff, new_line)
+    if original_line is not None:
+        return original_line
+    
+    for header, _ in file_diff.hunks:
+        if header.new_start <= new_line < header.new_start + header.new_count:
+            return header.original_start + min(new_line - header.new_start, header.original_count)
+    return new_line
+
+
+def _has_changes_in_range(sorted_lines: List[int], start_line: int, end_line: int) -> bool:
+    """
+    Check whether any changed line falls within a line range.
+    
+    Args:
+        sorted_lines: Changed line numbers in ascending order
+        start_line: First line of the range (inclusive)
+        end_line: Last line of the range (inclusive)
+        
+    Returns:
+        True if at least one changed line is within the range
+    """
+    idx = bisect.bisect_left(sorted_lines, start_line)
+    return idx < len(sorted_lines) and sorted_lines[idx] <= end_line
 
 
 def _count_changes(diff: Optional[str]) -> int:
@@ -489,14 +725,12 @@ def _count_changes(diff: Optional[str]) -> int:
     if not diff:
         return 0
     
-    additions = 0
-    deletions = 0
-    
-    for line in diff.splitlines():
-        if line.startswith('+') and not line.startswith('+++'):
-            additions += 1
-        elif line.startswith('-') and not line.startswith('---'):
-            deletions += 1
+    # Count line prefixes with C-level substring counts instead of a Python
+    # loop over lines. Rejoining the lines with a leading newline puts a
+    # '\n' before every line, whatever line breaks the diff used
+    text = '\n' + '\n'.join(diff.splitlines())
+    additions = text.count('\n+') - text.count('\n+++')
+    deletions = text.count('\n-') - text.count('\n---')
     
     return additions + deletions
 
@@ -522,7 +756,7 @@ def analyze_file_diff(
         List of ModifiedFunction objects
     """
     if file_diff.is_binary:
-        logger.info(f"Skipping binary file: {file_path}")
+        logger.info("Skipping binary file: %s", file_path)
         return []
     
     # Detect modified functions - our main analysis path for changed files
@@ -14,6 +14,27 @@ from ..utils.github_api import (
 )
 from ..models import ModifiedFile, CommitAnalysisResult
 
+# Map of file extensions to language names
+EXTENSION_LANGUAGE_MAP = {
+    '.py': 'Python',
+    '.js': 'JavaScript',
+    '.jsx': 'JavaScript',
+    '.ts': 'TypeScript',
+    '.tsx': 'TypeScript',
+    '.java': 'Java',
+    '.c': 'C',
+    '.cpp': 'C++',
+    '.h': 'C',
+    '.hpp': 'C++',
+    '.cs': 'csharp',
+    '.go': 'Go',
+    '.rb': 'Ruby',
+    '.php': 'PHP',
+    '.swift': 'Swift',
+    '.kt': 'Kotlin',
+    '.rs': 'Rust'
+}
+
 def analyze_github_commit_metadata(commit_url: str) -> CommitAnalysisResult:
     """
     Analyze a GitHub commit and extract file-level changes.
@@ -104,25 +125,5 @@ def detect_file_language(file_path: str) -> Optional[str]:
     Returns:
         Language name or None if unknown
     """
-    extension_map = {
-        '.py': 'Python',
-        '.js': 'JavaScript',
-        '.jsx': 'JavaScript',
-        '.ts': 'TypeScript',
-        '.tsx': 'TypeScript',
-        '.java': 'Java',
-        '.c': 'C',
-        '.cpp': 'C++',
-        '.h': 'C',
-        '.hpp': 'C++',
-        '.cs': 'csharp',
-        '.go': 'Go',
-        '.rb': 'Ruby',
-        '.php': 'PHP',
-        '.swift': 'Swift',
-        '.kt': 'Kotlin',
-        '.rs': 'Rust'
-    }
-    
     _, ext = os.path.splitext(file_path)
-    return extension_map.get(ext.lower())
\ No newline at end of file
+    return EXTENSION_LANGUAGE_MAP.get(ext.lower())
\ No newline at end of file
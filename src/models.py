@@ -5,10 +5,15 @@ This module defines the data structures used throughout DiffScope
 for representing files, functions, and changes.
 """
 
+import sys
 from typing import List, Dict, Optional, Any
 from enum import Enum
 from dataclasses import dataclass, field
 
+# Models created per file and per function use __slots__ where dataclasses
+# support it (Python 3.10+), avoiding a __dict__ on every instance
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
 
 class FunctionChangeType(str, Enum):
     """Type of change to a function."""
@@ -18,7 +23,7 @@ class FunctionChangeType(str, Enum):
     RENAMED = "renamed"
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ModifiedFile:
     """Information about a modified file in a commit."""
     filename: str
@@ -31,7 +36,7 @@ class ModifiedFile:
     previous_filename: Optional[str] = None
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ModifiedFunction:
     """Information about a modified function in a commit."""
     name: str
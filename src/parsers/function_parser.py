@@ -5,10 +5,13 @@ This module provides utilities to detect and extract information about functions
 in source code using tree-sitter. It supports multiple programming languages.
 """
 
+from collections import OrderedDict
 from typing import List, Dict, Optional, Any, Tuple
 import logging
+import bisect
+import hashlib
+import threading
 from .tree_sitter_utils import (
-    get_tree_sitter_parser,
     get_tree_sitter_language,
     is_language_supported,
     parse_code
@@ -246,36 +249,168 @@ FUNCTION_QUERIES = {
     """
 }
 
+# Capture names that mark methods; they take precedence for node_type
+METHOD_CAPTURE_TYPES = ('method', 'constructor', 'singleton_method')
 
-def parse_functions(content: str, language: str) -> List[Dict]:
+# Capture names that mark function-like nodes, in processing order
+FUNCTION_CAPTURE_TYPES = (
+    'function', 'method', 'constructor', 'arrow_function',
+    'singleton_method', 'function_declaration'
+)
+
+# Name capture to use for each function node type
+NAME_CAPTURE_MAPPING = {
+    'function': 'function_name',
+    'method': 'method_name',
+    'constructor': 'constructor_name',
+    'singleton_method': 'singleton_method_name',
+    'function_declaration': 'function_name',
+    'arrow_function': 'var_name'
+}
+
+# Languages with standalone arrow functions
+ARROW_FUNCTION_LANGUAGES = frozenset({'javascript', 'typescript'})
+
+# Compiled queries hold cursor state, so each thread keeps its own cache
+_thread_local = threading.local()
+
+# LRU cache of parse_functions results keyed by (language, sha256 of content)
+FUNCTION_CACHE_SIZE = 256
+_functions: "OrderedDict[Tuple[str, bytes], List[Dict]]" = OrderedDict()
+_functions_lock = threading.Lock()
+
+
+def _get_function_query(language: str) -> Any:
+    """
+    Get the compiled function query for a language, compiling it on first use.
+    
+    Args:
+        language: Lowercase language name with an entry in FUNCTION_QUERIES
+        
+    Returns:
+        Compiled tree-sitter query
+    """
+    queries = getattr(_thread_local, 'queries', None)
+    if queries is None:
+        queries = _thread_local.queries = {}
+    
+    if language not in queries:
+        tree_sitter_lang = get_tree_sitter_language(language)
+        queries[language] = tree_sitter_lang.query(FUNCTION_QUERIES[language])
+    
+    return queries[language]
+
+
+def clear_function_cache() -> None:
+    """
+    Clear the cache of parse_functions results.
+    Useful for testing and managing memory.
+    """
+    with _functions_lock:
+        _functions.clear()
+
+
+def _copy_functions(functions: List[Dict]) -> List[Dict]:
+    """Copy function dicts so callers can't mutate cached results."""
+    return [dict(func, parameters=list(func['parameters'])) for func in functions]
+
+
+def parse_functions(content: str, language: str, old_tree: Optional[Any] = None) -> List[Dict]:
     """
     Parse source code to identify functions.
     
+    Results are cached by content hash, so files that reappear across
+    commits (reverts, branches, unchanged sides of a diff) are only
+    analyzed once while they stay in the cache.
+    
     Args:
         content: Source code content
         language: Programming language
+        old_tree: Optional tree of a previous version, already edited to
+            match content (see ``edit_tree``), to enable incremental reparsing
         
     Returns:
         List of dictionaries containing function information
     """
+    return _parse_functions_cached(content, language, old_tree)[0]
+
+
+def parse_functions_with_tree(content: str, language: str) -> Tuple[List[Dict], Optional[Any]]:
+    """
+    Parse source code to identify functions, also returning its parse tree.
+    
+    The caller owns the tree and may edit it in place (see ``edit_tree``)
+    to parse a later version incrementally.
+    
+    Args:
+        content: Source code content
+        language: Programming language
+        
+    Returns:
+        Tuple of (functions, tree). The tree is None when content wasn't
+        parsed, because the functions were cached or the content is empty.
+    """
+    return _parse_functions_cached(content, language)
+
+
+def _parse_functions_cached(
+    content: str,
+    language: str,
+    old_tree: Optional[Any] = None
+) -> Tuple[List[Dict], Optional[Any]]:
+    """
+    Look up functions in the cache, parsing and caching them on a miss.
+    
+    Args:
+        content: Source code content
+        language: Programming language
+        old_tree: Optional edited tree of a previous version for incremental reparsing
+        
+    Returns:
+        Tuple of (functions, tree parsed by this call or None)
+    """
     language = language.lower()
     if language not in FUNCTION_QUERIES:
         logger.warning(f"Language '{language}' is not supported for function parsing")
-        return []
+        return [], None
     
     if not content:
-        return []
-    
+        return [], None
+    
+    # Encode once; the same bytes are hashed here and handed to the parser
+    source = content.encode('utf8')
+    key = (language, hashlib.sha256(source).digest())
+    with _functions_lock:
+        functions = _functions.get(key)
+        if functions is not None:
+            _functions.move_to_end(key)
+            return _copy_functions(functions), None
+    
+    tree = parse_code(source, language, old_tree)
+    functions = _parse_functions(source, language, tree)
+    
+    with _functions_lock:
+        _functions[key] = functions
+        if len(_functions) > FUNCTION_CACHE_SIZE:
+            _functions.popitem(last=False)
+    
+    return _copy_functions(functions), tree
 
-    # Get parser and language
-    parser = get_tree_sitter_parser(language)
-    tree_sitter_lang = get_tree_sitter_language(language)
-    
-    # Parse the code
-    tree = parser.parse(bytes(content, 'utf8'))
+
+def _parse_functions(source: bytes, language: str, tree: Any) -> List[Dict]:
+    """
+    Run the function query over parsed content.
     
-    # Create the query
-    query = tree_sitter_lang.query(FUNCTION_QUERIES[language])
+    Args:
+        source: Non-empty UTF-8 encoded source code
+        language: Lowercase language name with an entry in FUNCTION_QUERIES
+        tree: Parse tree of source
+        
+    Returns:
+        List of dictionaries containing function information
+    """
+    # Get the compiled query
+    query = _get_function_query(language)
     
     # Execute the query to get captures
     captures = query.captures(tree.root_node)
@@ -287,12 +422,15 @@ def parse_functions(content: str, language: str) -> List[Dict]:
     # Key is (start_line, end_line) tuple
     function_positions = {}
     
+    # Name nodes sorted by start byte, with a parallel list of offsets, so the
+    # name belonging to a function can be found with a binary search
+    sorted_name_nodes = {}
+    
     # Process methods first so they take precedence for node_type
     node_types_by_position = {}
     
     # First, mark methods specifically
-    method_types = ['method', 'constructor', 'singleton_method']
-    for method_type in method_types:
+    for method_type in METHOD_CAPTURE_TYPES:
         if method_type in captures:
             for method_node in captures[method_type]:
                 start_line, start_col = method_node.start_point
@@ -306,12 +444,7 @@ def parse_functions(content: str, language: str) -> List[Dict]:
                 node_types_by_position[position_key] = method_type
     
     # Process function and method nodes
-    function_types = [
-        'function', 'method', 'constructor', 'arrow_function', 
-        'singleton_method', 'function_declaration'
-    ]
-    
-    for function_type in function_types:
+    for function_type in FUNCTION_CAPTURE_TYPES:
         if function_type not in captures:
             continue
             
@@ -342,83 +475,59 @@ def parse_functions(content: str, language: str) -> List[Dict]:
             }
             
             # Choose the right name capture based on the node_type
-            name_capture_mapping = {
-                'function': 'function_name',
-                'method': 'method_name',
-                'constructor': 'constructor_name',
-                'singleton_method': 'singleton_method_name',
-                'function_declaration': 'function_name',
-                'arrow_function': 'var_name'
-            }
-            
-            name_capture = name_capture_mapping.get(node_type, 'function_name')
+            name_capture = NAME_CAPTURE_MAPPING.get(node_type, 'function_name')
             
             if name_capture in captures:
-                # For each name node, check if it's contained within this function
-                for name_node in captures[name_capture]:
-                    if check_node_relationship(name_node, func_node, 'contains'):
-                        func_data['name'] = name_node.text.decode('utf8')
-                        break
+                if name_capture not in sorted_name_nodes:
+                    name_nodes = sorted(captures[name_capture], key=lambda n: n.start_byte)
+                    sorted_name_nodes[name_capture] = (
+                        name_nodes, [n.start_byte for n in name_nodes]
+                    )
+                name_nodes, name_starts = sorted_name_nodes[name_capture]
+                
+                # The first name node starting inside this function is its name
+                idx = bisect.bisect_left(name_starts, func_node.start_byte)
+                if idx < len(name_nodes) and check_node_relationship(name_nodes[idx], func_node, 'contains'):
+                    func_data['name'] = name_nodes[idx].text.decode('utf8')
                         
             # Extract parameters based on language and node type
             if language == 'rust' and (node_type == 'function' or node_type == 'method'):
-                # Find parameters in Rust functions
-                for child in func_node.children:
-                    if child.type == 'parameters':
-                        # Process each parameter in the parameters list
-                        for param_node in child.children:
-                            if param_node.type == 'parameter':
-                                # Extract parameter name from parameter node
-                                param_name = None
-                                for param_child in param_node.children:
-                                    if param_child.type == 'identifier':
-                                        param_name = param_child.text.decode('utf8')
-                                        break
-                                
-                                if param_name:
-                                    func_data['parameters'].append(param_name)
+                # Go straight to the parameter list instead of scanning all children
+                params_node = func_node.child_by_field_name('parameters')
+                if params_node is not None:
+                    for param_node in params_node.named_children:
+                        if param_node.type == 'parameter':
+                            # Extract parameter name from the parameter's pattern
+                            pattern_node = param_node.child_by_field_name('pattern')
+                            if pattern_node is not None and pattern_node.type == 'identifier':
+                                func_data['parameters'].append(pattern_node.text.decode('utf8'))
             
             # Extract parameters for Ruby methods
             elif language == 'ruby' and (node_type == 'method' or node_type == 'singleton_method'):
-                # For Ruby, we need to check all parameter nodes and see if they belong to this method
-                if 'parameter' in captures:
-                    # We'll store parameters with their position to ensure correct order
-                    method_params = []
-                    
-                    for param_node in captures['parameter']:
-                        # Find the parent method_parameters node
-                        method_params_node = param_node.parent
-                        if method_params_node:
-                            # Find the parent method node (could be method or singleton_method)
-                            method_node = method_params_node.parent
-                            if method_node and method_node.id == func_node.id:
-                                # This parameter belongs to this method
-                                param_name = param_node.text.decode('utf8')
-                                # Store both the parameter name and its position
-                                method_params.append((param_node.start_byte, param_name))
-                    
-                    # Sort parameters by their position to maintain the correct order
-                    method_params.sort(key=lambda x: x[0])
-                    
-                    # Add parameters in the correct order
-                    for _, param_name in method_params:
-                        if param_name not in func_data['parameters']:
-                            func_data['parameters'].append(param_name)
+                # Descend into this method's own parameter list; its children
+                # are already in source order
+                params_node = func_node.child_by_field_name('parameters')
+                if params_node is not None:
+                    for param_node in params_node.named_children:
+                        if param_node.type == 'identifier':
+                            param_name = param_node.text.decode('utf8')
+                            if param_name not in func_data['parameters']:
+                                func_data['parameters'].append(param_name)
             
             # Extract parameters for csharp methods
             elif language == 'csharp' and (node_type == 'method' or node_type == 'constructor'):
-                # Find parameter list in csharp method/constructor
-                for child in func_node.children:
-                    if child.type == 'parameter_list':
-                        # Process each parameter in the list
-                        for param_child in child.children:
-                            if param_child.type == 'parameter':
-                                # Find the identifier within the parameter
-                                for param_part in param_child.children:
-                                    if param_part.type == 'identifier':
-                                        param_name = param_part.text.decode('utf8')
-                                        if param_name not in func_data['parameters']:
-                                            func_data['parameters'].append(param_name)
+                # Go straight to the parameter list of the method/constructor
+                params_node = func_node.child_by_field_name('parameters')
+                if params_node is not None:
+                    # Process each parameter in the list
+                    for param_child in params_node.named_children:
+                        if param_child.type == 'parameter':
+                            # Find the identifier within the parameter
+                            for param_part in param_child.named_children:
+                                if param_part.type == 'identifier':
+                                    param_name = param_part.text.decode('utf8')
+                                    if param_name not in func_data['parameters']:
+                                        func_data['parameters'].append(param_name)
             
             # Only add if we found a name (or for anonymous functions in some languages)
             if func_data['name'] or node_type == 'arrow_function':
@@ -432,7 +541,7 @@ def parse_functions(content: str, language: str) -> List[Dict]:
     # Handle language-specific cases
     
     # JavaScript/TypeScript arrow functions
-    if language in ['javascript', 'typescript']:
+    if language in ARROW_FUNCTION_LANGUAGES:
         # Process arrow functions
         if 'arrow_function' in captures:
             for arrow_node in captures['arrow_function']:
@@ -473,7 +582,7 @@ def parse_functions(content: str, language: str) -> List[Dict]:
                 functions.append(func_data)
                 function_positions[position_key] = True
     
-    logger.debug(f"Found {len(functions)} functions in {language} code")
+    logger.debug("Found %d functions in %s code", len(functions), language)
     return functions
     
 
@@ -533,7 +642,12 @@ def get_function_at_line(content: str, language: str, line_number: int) -> Optio
     return None
 
 
-def extract_function_content(content: str, start_line: int, end_line: int) -> Optional[str]:
+def extract_function_content(
+    content: str,
+    start_line: int,
+    end_line: int,
+    lines: Optional[List[str]] = None
+) -> Optional[str]:
     """
     Extract the content of a function from file content.
     
@@ -541,15 +655,17 @@ def extract_function_content(content: str, start_line: int, end_line: int) -> Op
         content: Content of the file
         start_line: Start line of the function
         end_line: End line of the function
+        lines: Optional result of content.splitlines(), to avoid re-splitting
+            the file when extracting several functions from it
         
     Returns:
         String containing the function code
     """
     if not content:
         return None
-        
     
-    lines = content.splitlines()
+    if lines is None:
+        lines = content.splitlines()
     if 0 < start_line <= len(lines) and 0 < end_line <= len(lines):
         return '\n'.join(lines[start_line-1:end_line])
     
@@ -5,13 +5,25 @@ This module provides functions to interact with the tree-sitter-language-pack
 for parsing and analyzing code in different programming languages.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Union
+from itertools import accumulate
+import threading
 from tree_sitter_language_pack import get_language, get_parser
 
-# Cache for initialized parsers and languages
-_parsers: Dict[str, Any] = {}
+# Cache for initialized languages
 _languages: Dict[str, Any] = {}
 
+# Parsers are not thread-safe, so each thread keeps its own parser cache
+_thread_local = threading.local()
+
+
+def _get_thread_parsers() -> Dict[str, Any]:
+    """Get the parser cache for the current thread."""
+    parsers = getattr(_thread_local, 'parsers', None)
+    if parsers is None:
+        parsers = _thread_local.parsers = {}
+    return parsers
+
 # List of languages with verified function detection support
 SUPPORTED_LANGUAGES = ['python', 'javascript', 'typescript', 'java', 'c', 'cpp', 'go', 'php', 'rust', 'ruby', 'csharp']
 
@@ -19,6 +31,7 @@ SUPPORTED_LANGUAGES = ['python', 'javascript', 'typescript', 'java', 'c', 'cpp',
 def get_tree_sitter_parser(language: str) -> Any:
     """
     Get a tree-sitter parser for the specified language.
+    Parsers are cached per thread, since they must not be shared between threads.
     
     Args:
         language: Language name (e.g. 'python', 'javascript')
@@ -30,13 +43,14 @@ def get_tree_sitter_parser(language: str) -> Any:
         ValueError: If the language is not supported
     """
     language = language.lower()
-    if language not in _parsers:
+    parsers = _get_thread_parsers()
+    if language not in parsers:
         try:
-            _parsers[language] = get_parser(language)
+            parsers[language] = get_parser(language)
         except (ValueError, KeyError, LookupError) as e:
             raise ValueError(f"Language not supported: {language}") from e
     
-    return _parsers[language]
+    return parsers[language]
 
 
 def get_tree_sitter_language(language: str) -> Any:
@@ -105,19 +119,25 @@ def get_supported_languages() -> List[str]:
 def clear_caches() -> None:
     """
     Clear the parser and language caches.
+    Parsers are only cleared for the calling thread.
     Useful for testing and managing memory.
     """
-    _parsers.clear()
+    _get_thread_parsers().clear()
     _languages.clear()
 
 
-def parse_code(code: str, language: str) -> Any:
+def parse_code(code: Union[str, bytes], language: str, old_tree: Optional[Any] = None) -> Any:
     """
     Parse source code using a tree-sitter parser.
     
+    Every call returns a new tree owned by the caller, which may edit it in
+    place (see ``edit_tree``) to parse a later version incrementally.
+    
     Args:
-        code: Source code to parse
+        code: Source code to parse, as text or already UTF-8 encoded bytes
         language: Programming language of the code
+        old_tree: Optional previously parsed tree, already adjusted with
+            ``tree.edit(...)``, to enable incremental reparsing
         
     Returns:
         Tree-sitter parse tree
@@ -125,5 +145,90 @@ def parse_code(code: str, language: str) -> Any:
     Raises:
         ValueError: If the language is not supported
     """
-    parser = get_tree_sitter_parser(language)
-    return parser.parse(bytes(code, 'utf8')) 
\ No newline at end of file
+    parser = get_tree_sitter_parser(language.lower())
+    source = code if isinstance(code, bytes) else code.encode('utf8')
+    if old_tree is not None:
+        return parser.parse(source, old_tree)
+    return parser.parse(source)
+
+
+def _line_starts(source: bytes) -> List[int]:
+    """Get the byte offset of the start of each line (may overshoot the end by one)."""
+    return list(accumulate((len(line) + 1 for line in source.split(b'\n')), initial=0))
+
+
+def _row_position(line_starts: List[int], row: int, length: int) -> Tuple[int, Tuple[int, int]]:
+    """Get the byte offset and point of the start of a row, clamped to the end of the source."""
+    if row < len(line_starts) and line_starts[row] <= length:
+        return line_starts[row], (row, 0)
+    last_row = len(line_starts) - 2
+    return length, (last_row, length - line_starts[last_row])
+
+
+def edit_tree(
+    tree: Any,
+    old_source: bytes,
+    new_source: bytes,
+    line_edits: List[Tuple[int, int, int, int]]
+) -> Optional[Any]:
+    """
+    Edit a parse tree in place to match new source code, so the new source
+    can be parsed incrementally with ``parse_code(..., old_tree=...)``.
+    
+    Lines outside the edits are checked to be identical in both versions;
+    if they aren't, the edits don't describe the change and the tree is
+    left unmodified.
+    
+    Args:
+        tree: Parse tree of old_source owned by the caller
+        old_source: UTF-8 encoded source the tree was parsed from
+        new_source: UTF-8 encoded new source
+        line_edits: Sorted, non-overlapping (old_row, old_row_count, new_row,
+            new_row_count) tuples with 0-indexed rows, such as diff hunks
+        
+    Returns:
+        The edited tree, or None if the edits don't match the sources
+    """
+    old_starts = _line_starts(old_source)
+    new_starts = _line_starts(new_source)
+    old_length = len(old_source)
+    new_length = len(new_source)
+    
+    # Resolve edits to byte ranges, checking the unchanged text between them
+    edits = []
+    old_pos = new_pos = 0
+    for old_row, old_count, new_row, new_count in line_edits:
+        old_start, old_start_point = _row_position(old_starts, old_row, old_length)
+        old_end, old_end_point = _row_position(old_starts, old_row + old_count, old_length)
+        new_start, new_start_point = _row_position(new_starts, new_row, new_length)
+        new_end, new_end_point = _row_position(new_starts, new_row + new_count, new_length)
+        if old_start < old_pos or new_start < new_pos:
+            return None
+        if old_source[old_pos:old_start] != new_source[new_pos:new_start]:
+            return None
+        edits.append((old_start, old_end, old_start_point, old_end_point,
+                      new_start, new_end, new_start_point, new_end_point))
+        old_pos, new_pos = old_end, new_end
+    if old_source[old_pos:] != new_source[new_pos:]:
+        return None
+    
+    # Apply edits from last to first, so the text before each edit still
+    # has its old positions
+    for (old_start, old_end, old_start_point, old_end_point,
+         new_start, new_end, new_start_point, new_end_point) in reversed(edits):
+        row_delta = new_end_point[0] - new_start_point[0]
+        if row_delta:
+            edited_end_point = (old_start_point[0] + row_delta, new_end_point[1])
+        else:
+            edited_end_point = (old_start_point[0],
+                                old_start_point[1] + new_end_point[1] - new_start_point[1])
+        tree.edit(
+            start_byte=old_start,
+            old_end_byte=old_end,
+            new_end_byte=old_start + new_end - new_start,
+            start_point=old_start_point,
+            old_end_point=old_end_point,
+            new_end_point=edited_end_point,
+        )
+    
+    return tree
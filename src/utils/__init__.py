@@ -13,6 +13,7 @@ from .github_api import (
 )
 from .diff_utils import (
     parse_diff,
+    iter_file_diffs,
     parse_github_patch,
     extract_function_diff,
     extract_function_diff_from_patch,
@@ -30,6 +31,7 @@ __all__ = [
     
     # Diff utilities
     'parse_diff',
+    'iter_file_diffs',
     'parse_github_patch',
     'extract_function_diff',
     'extract_function_diff_from_patch',
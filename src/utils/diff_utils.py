@@ -6,7 +6,8 @@ and mapping changes to line numbers in files.
 """
 
 import re
-from typing import Dict, List, Tuple, Optional, Set, NamedTuple
+import bisect
+from typing import Dict, List, Tuple, Optional, Set, NamedTuple, Iterator
 import logging
 import difflib
 
@@ -35,9 +36,18 @@ class FileDiff(NamedTuple):
     is_rename: bool = False
 
 
+class FunctionDiffIndex(NamedTuple):
+    """Sorted lookups for extracting many function diffs from one FileDiff."""
+    hunk_starts: List[int]  # new_start of each hunk, in hunk order
+    hunk_ends: List[int]  # last new-file line of each hunk
+    new_changes: List[int]  # sorted changed line numbers in the new file
+
+
 # Regular expressions for parsing diff components
+RE_DIFF_GIT = re.compile(r'diff --git (a/.*) (b/.*)')
 RE_HUNK_HEADER = re.compile(
-    r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(?:\s(.*))?$'
+    r'^@@ -(?P<original_start>\d+)(?:,(?P<original_count>\d+))? '
+    r'\+(?P<new_start>\d+)(?:,(?P<new_count>\d+))? @@(?:\s(?P<context>.*))?$'
 )
 RE_FILE_HEADER_A = re.compile(r'^--- (?:a/)?(.*?)(?:\s.*)?$')
 RE_FILE_HEADER_B = re.compile(r'^\+\+\+ (?:b/)?(.*?)(?:\s.*)?$')
@@ -47,6 +57,29 @@ RE_RENAME = re.compile(r'^rename (from|to) (.*)$')
 RE_BINARY = re.compile(r'^Binary files (.*) and (.*) differ$')
 
 
+def _parse_hunk_header(line: str) -> Optional[HunkHeader]:
+    """
+    Parse a hunk header line with a single regex match.
+    
+    Args:
+        line: A line starting with '@@'.
+        
+    Returns:
+        The parsed HunkHeader, or None if the line is not a valid hunk header.
+    """
+    header_match = RE_HUNK_HEADER.match(line)
+    if not header_match:
+        return None
+    
+    original_start, original_count, new_start, new_count, _ = header_match.groups()
+    return HunkHeader(
+        original_start=int(original_start),
+        original_count=int(original_count or 1),
+        new_start=int(new_start),
+        new_count=int(new_count or 1)
+    )
+
+
 def parse_diff(diff_content: str) -> List[FileDiff]:
     """
     Parse a unified diff string and return a list of FileDiff objects.
@@ -57,19 +90,37 @@ def parse_diff(diff_content: str) -> List[FileDiff]:
     Returns:
         A list of FileDiff objects, one for each file in the diff.
     """
+    return list(iter_file_diffs(diff_content))
+
+
+def iter_file_diffs(diff_content: str) -> Iterator[FileDiff]:
+    """
+    Parse a unified diff string lazily, yielding one FileDiff per file.
+    
+    Lets callers analyze and release each file before the next one is
+    parsed, instead of holding every FileDiff of a large diff at once.
+    
+    Args:
+        diff_content: The content of the diff.
+        
+    Yields:
+        FileDiff objects in the order the files appear in the diff.
+    """
     if not diff_content:
-        return []
+        return
     
     lines = diff_content.split('\n')
-    file_diffs = []
     
-    i = 0
+    # Find every file header in a single pass; each file diff runs from its
+    # header up to the next one
+    file_starts = [idx for idx, line in enumerate(lines) if line.startswith('diff --git')]
+    
     # Track rename information between diff blocks
     pending_rename = None
     
-    while i < len(lines):
+    for i in file_starts:
         # Check if this is a rename section without file content
-        if i + 3 < len(lines) and lines[i].startswith('diff --git') and lines[i+1].startswith('similarity index'):
+        if i + 3 < len(lines) and lines[i+1].startswith('similarity index'):
             if lines[i+2].startswith('rename from') and lines[i+3].startswith('rename to'):
                 # This is a rename block, extract the file paths
                 from_file = lines[i+2][12:].strip()
@@ -77,40 +128,18 @@ def parse_diff(diff_content: str) -> List[FileDiff]:
                 pending_rename = (f"a/{from_file}", f"b/{to_file}")
                 
                 # Skip this block and continue to the next diff
-                i += 4
-                while i < len(lines) and not lines[i].startswith('diff --git'):
-                    i += 1
                 continue
         
         # Parse the next file diff
         file_diff = _parse_file_diff(lines, i)
-        if file_diff:
-            # Check if this is the content for a pending rename
-            if pending_rename and file_diff.old_file == pending_rename[0] and file_diff.new_file == pending_rename[1]:
-                # Update the file diff to mark it as a rename
-                file_diff = FileDiff(
-                    old_file=file_diff.old_file,
-                    new_file=file_diff.new_file,
-                    hunks=file_diff.hunks,
-                    original_changes=file_diff.original_changes,
-                    new_changes=file_diff.new_changes,
-                    is_new=file_diff.is_new,
-                    is_deleted=file_diff.is_deleted,
-                    is_binary=file_diff.is_binary,
-                    is_rename=True  # Mark as rename
-                )
-                pending_rename = None
-            
-            file_diffs.append(file_diff)
-            
-            # Skip to the start of the next file diff
-            i += 1
-            while i < len(lines) and not lines[i].startswith('diff --git'):
-                i += 1
-        else:
-            i += 1
-    
-    return file_diffs
+        
+        # Check if this is the content for a pending rename
+        if pending_rename and file_diff.old_file == pending_rename[0] and file_diff.new_file == pending_rename[1]:
+            # Update the file diff to mark it as a rename
+            file_diff = file_diff._replace(is_rename=True)
+            pending_rename = None
+        
+        yield file_diff
 
 
 def _parse_file_diff(lines: List[str], start_idx: int) -> Optional[FileDiff]:
@@ -127,7 +156,7 @@ def _parse_file_diff(lines: List[str], start_idx: int) -> Optional[FileDiff]:
     is_rename = False
     
     # Parse diff --git line to extract file names
-    diff_git_match = re.match(r'diff --git (a/.*) (b/.*)', lines[i])
+    diff_git_match = RE_DIFF_GIT.match(lines[i])
     if diff_git_match:
         old_file = diff_git_match.group(1)
         new_file = diff_git_match.group(2)
@@ -202,32 +231,14 @@ def _parse_file_diff(lines: List[str], start_idx: int) -> Optional[FileDiff]:
     new_changes = {}
     
     while i < len(lines) and lines[i].startswith('@@ '):
-        hunk_result = _parse_hunk(lines, i)
+        # Changed lines are recorded while the hunk is parsed
+        hunk_result = _parse_hunk(lines, i, original_changes, new_changes)
         if not hunk_result:
             break
             
         hunk_header, hunk_lines, next_idx = hunk_result
         hunks.append((hunk_header, hunk_lines))
         
-        # Process the lines in this hunk, respecting the header line numbers
-        original_line_num = hunk_header.original_start
-        new_line_num = hunk_header.new_start
-        
-        # For each line in the hunk content
-        for line in hunk_lines:
-            if line.startswith(' '):  # Context line
-                # Exists in both original and new
-                original_line_num += 1
-                new_line_num += 1
-            elif line.startswith('-'):  # Removed line
-                # Exists only in original
-                original_changes[original_line_num] = line[1:]
-                original_line_num += 1
-            elif line.startswith('+'):  # Added line
-                # Exists only in new
-                new_changes[new_line_num] = line[1:]
-                new_line_num += 1
-        
         i = next_idx
     
     # For deleted files, use b/original_path instead of /dev/null
@@ -249,13 +260,22 @@ def _parse_file_diff(lines: List[str], start_idx: int) -> Optional[FileDiff]:
     )
 
 
-def _parse_hunk(lines: List[str], start_idx: int) -> Optional[Tuple[HunkHeader, List[str], int]]:
+def _parse_hunk(
+    lines: List[str],
+    start_idx: int,
+    original_changes: Dict[int, str],
+    new_changes: Dict[int, str]
+) -> Optional[Tuple[HunkHeader, List[str], int]]:
     """
     Parse a single hunk from the diff.
     
+    Removed and added lines are recorded by line number in the same pass.
+    
     Args:
         lines: The lines of the diff.
         start_idx: The index of the hunk header line.
+        original_changes: Dict to record removed lines in (line number -> content).
+        new_changes: Dict to record added lines in (line number -> content).
         
     Returns:
         A tuple of (hunk_header, hunk_lines, next_idx) if successful, 
@@ -265,61 +285,65 @@ def _parse_hunk(lines: List[str], start_idx: int) -> Optional[Tuple[HunkHeader,
         return None
     
     # Parse hunk header
-    header_match = RE_HUNK_HEADER.match(lines[start_idx])
-    if not header_match:
+    hunk_header = _parse_hunk_header(lines[start_idx])
+    if not hunk_header:
         logger.error(f"Failed to parse hunk header: {lines[start_idx]}")
         return None
     
-    original_start = int(header_match.group(1))
-    original_count = int(header_match.group(2) or 1)
-    new_start = int(header_match.group(3))
-    new_count = int(header_match.group(4) or 1)
-    
-    # Create hunk header object
-    hunk_header = HunkHeader(
-        original_start=original_start,
-        original_count=original_count,
-        new_start=new_start,
-        new_count=new_count
-    )
-    
     # Parse hunk content
     hunk_lines = []
+    append_line = hunk_lines.append
+    num_lines = len(lines)
     i = start_idx + 1
     
     # Validate line counts
-    remaining_orig_lines = original_count
-    remaining_new_lines = new_count
+    remaining_orig_lines = hunk_header.original_count
+    remaining_new_lines = hunk_header.new_count
     
-    while i < len(lines):
+    # Current line numbers in the original and new file
+    original_line_num = hunk_header.original_start
+    new_line_num = hunk_header.new_start
+    
+    while i < num_lines:
         line = lines[i]
+        marker = line[:1]
         # Check for end of hunk markers
-        if line.startswith('@@ ') or line.startswith('diff --git'):
+        if (marker == '@' and line.startswith('@@ ')) or (marker == 'd' and line.startswith('diff --git')):
             break
             
         # Empty line (could be context or end of file)
         if not line:
-            hunk_lines.append(' ')
+            append_line(' ')
             remaining_orig_lines -= 1
             remaining_new_lines -= 1
+            original_line_num += 1
+            new_line_num += 1
             i += 1
             continue
             
-        # Line classification
-        if line.startswith(' '):  # Context line
-            hunk_lines.append(line)
+        # Line classification by first character
+        if marker == ' ':  # Context line
+            append_line(line)
             remaining_orig_lines -= 1
             remaining_new_lines -= 1
-        elif line.startswith('-'):  # Removed line
-            hunk_lines.append(line)
+            original_line_num += 1
+            new_line_num += 1
+        elif marker == '-':  # Removed line
+            append_line(line)
             remaining_orig_lines -= 1
-        elif line.startswith('+'):  # Added line
-            hunk_lines.append(line)
+            original_changes[original_line_num] = line[1:]
+            original_line_num += 1
+        elif marker == '+':  # Added line
+            append_line(line)
             remaining_new_lines -= 1
+            new_changes[new_line_num] = line[1:]
+            new_line_num += 1
         else:  # Unexpected line format, treat as context
-            hunk_lines.append(' ' + line)
+            append_line(' ' + line)
             remaining_orig_lines -= 1
             remaining_new_lines -= 1
+            original_line_num += 1
+            new_line_num += 1
             
         i += 1
         
@@ -384,40 +408,11 @@ def map_original_to_new_line(file_diff: FileDiff, original_line: int) -> Optiona
     if file_diff.is_new and original_line > 0:
         return None  # Original line doesn't exist for new files
     
-    # Check if the line was deleted (exactly matches a key in original_changes)
-    if original_line in file_diff.original_changes:
-        # Check all hunks to see if this line is mapped or deleted
-        for header, content in file_diff.hunks:
-            if header.original_start <= original_line < header.original_start + header.original_count:
-                # Line is in this hunk
-                # Calculate position within the hunk
-                pos_in_hunk = original_line - header.original_start
-                
-                # Scan through content to find line mapping
-                curr_orig = 0
-                curr_new = 0
-                
-                for line in content:
-                    if curr_orig == pos_in_hunk:
-                        if line.startswith('-'):
-                            # This line was deleted
-                            return None
-                        # Otherwise it's a context line that exists in both versions
-                        return header.new_start + curr_new
-                    
-                    if line.startswith(' '):  # Context line
-                        curr_orig += 1
-                        curr_new += 1
-                    elif line.startswith('-'):  # Deleted line
-                        curr_orig += 1
-                    elif line.startswith('+'):  # Added line
-                        curr_new += 1
-    
-    # Check if the line is within any hunk
+    # Check if the line is within any hunk; a deleted line is always found
+    # in its hunk's content and maps to None
     for header, content in file_diff.hunks:
         if header.original_start <= original_line < header.original_start + header.original_count:
             # Line is in this hunk, compute its new position
-            line_offset = 0
             orig_pos = 0
             new_pos = 0
             
@@ -437,7 +432,6 @@ def map_original_to_new_line(file_diff: FileDiff, original_line: int) -> Optiona
                     orig_pos += 1
                 elif line.startswith('+'):  # Added line
                     new_pos += 1
-                    line_offset += 1
             
             # If we got here, the line wasn't explicitly handled above
             # Calculate based on additions/deletions before this line
@@ -560,7 +554,30 @@ def generate_line_map(file_diff: FileDiff) -> Dict[int, Optional[int]]:
     return line_map
 
 
-def extract_function_diff(file_diff: FileDiff, func_start: int, func_end: int) -> Optional[str]:
+def index_function_diffs(file_diff: FileDiff) -> Optional[FunctionDiffIndex]:
+    """
+    Build the lookups extract_function_diff uses to avoid rescanning every hunk.
+    
+    Args:
+        file_diff: The file diff.
+        
+    Returns:
+        A FunctionDiffIndex, or None if the hunks are not in new-file order.
+    """
+    hunk_starts = [header.new_start for header, _ in file_diff.hunks]
+    hunk_ends = [header.new_start + header.new_count - 1 for header, _ in file_diff.hunks]
+    if any(hunk_starts[i] > hunk_starts[i + 1] or hunk_ends[i] > hunk_ends[i + 1]
+           for i in range(len(hunk_starts) - 1)):
+        return None
+    return FunctionDiffIndex(hunk_starts, hunk_ends, sorted(file_diff.new_changes))
+
+
+def extract_function_diff(
+    file_diff: FileDiff,
+    func_start: int,
+    func_end: int,
+    index: Optional[FunctionDiffIndex] = None
+) -> Optional[str]:
     """
     Extract a diff limited to a specific function range in the new file.
     
@@ -568,6 +585,8 @@ def extract_function_diff(file_diff: FileDiff, func_start: int, func_end: int) -
         file_diff: The file diff.
         func_start: The function start line in the new file.
         func_end: The function end line in the new file.
+        index: Optional index from index_function_diffs, to binary search
+            hunks and changed lines when extracting diffs for many functions.
         
     Returns:
         A string containing the diff limited to the function, or None if there are no changes.
@@ -576,14 +595,19 @@ def extract_function_diff(file_diff: FileDiff, func_start: int, func_end: int) -
         return None
     
     # Find hunks that overlap with the function
-    relevant_hunks = []
-    
-    for header, content in file_diff.hunks:
-        hunk_new_end = header.new_start + header.new_count - 1
+    if index is not None:
+        first = bisect.bisect_left(index.hunk_ends, func_start)
+        last = bisect.bisect_right(index.hunk_starts, func_end)
+        relevant_hunks = file_diff.hunks[first:last]
+    else:
+        relevant_hunks = []
         
-        # Check if this hunk overlaps with the function range
-        if (header.new_start <= func_end and hunk_new_end >= func_start):
-            relevant_hunks.append((header, content))
+        for header, content in file_diff.hunks:
+            hunk_new_end = header.new_start + header.new_count - 1
+            
+            # Check if this hunk overlaps with the function range
+            if (header.new_start <= func_end and hunk_new_end >= func_start):
+                relevant_hunks.append((header, content))
     
     if not relevant_hunks:
         return None
@@ -591,22 +615,24 @@ def extract_function_diff(file_diff: FileDiff, func_start: int, func_end: int) -
     # Check if any changes actually affect the function
     has_changes = False
     
-    # Helper function to check if a line is within the function bounds
-    def is_in_function_range(line_num):
-        return func_start <= line_num <= func_end
-    
     # Check for changes in the function range
-    for line_num in file_diff.new_changes:
-        if is_in_function_range(line_num):
-            has_changes = True
-            break
+    if index is not None:
+        i = bisect.bisect_left(index.new_changes, func_start)
+        has_changes = i < len(index.new_changes) and index.new_changes[i] <= func_end
+    else:
+        for line_num in file_diff.new_changes:
+            if func_start <= line_num <= func_end:
+                has_changes = True
+                break
     
-    # Check if any original line that was removed maps to within the function
-    for original_line_num in file_diff.original_changes:
-        mapped_line = map_original_to_new_line(file_diff, original_line_num)
-        if mapped_line is not None and is_in_function_range(mapped_line):
-            has_changes = True
-            break
+    # Check if any original line that was removed maps to within the function.
+    # Mapping rescans the hunks for every line, so only do it when needed.
+    if not has_changes:
+        for original_line_num in file_diff.original_changes:
+            mapped_line = map_original_to_new_line(file_diff, original_line_num)
+            if mapped_line is not None and func_start <= mapped_line <= func_end:
+                has_changes = True
+                break
     
     if not has_changes:
         return None
@@ -657,46 +683,35 @@ def parse_github_patch(patch: str, file_path: str) -> Optional[FileDiff]:
             i += 1
             continue
             
-        header_match = RE_HUNK_HEADER.match(lines[i])
-        if not header_match:
+        hunk_header = _parse_hunk_header(lines[i])
+        if not hunk_header:
             logger.warning(f"Failed to parse hunk header: {lines[i]}")
             i += 1
             continue
         
-        original_start = int(header_match.group(1))
-        original_count = int(header_match.group(2) or 1)
-        new_start = int(header_match.group(3))
-        new_count = int(header_match.group(4) or 1)
-        
-        # Create hunk header
-        hunk_header = HunkHeader(
-            original_start=original_start,
-            original_count=original_count,
-            new_start=new_start,
-            new_count=new_count
-        )
-        
         # Parse hunk content
         hunk_lines = []
+        append_line = hunk_lines.append
         i += 1  # Move past the header
         
         # Keep track of line numbers for mapping
-        original_line_num = original_start
-        new_line_num = new_start
+        original_line_num = hunk_header.original_start
+        new_line_num = hunk_header.new_start
         
         # Continue until the next hunk header or end of patch
         while i < len(lines) and not lines[i].startswith('@@'):
             line = lines[i]
-            hunk_lines.append(line)
+            append_line(line)
             
-            # Track changes based on line type
-            if line.startswith(' '):  # Context line
+            # Track changes based on the line's first character
+            marker = line[:1]
+            if marker == ' ':  # Context line
                 original_line_num += 1
                 new_line_num += 1
-            elif line.startswith('-'):  # Removed line
+            elif marker == '-':  # Removed line
                 original_changes[original_line_num] = line[1:]
                 original_line_num += 1
-            elif line.startswith('+'):  # Added line
+            elif marker == '+':  # Added line
                 new_changes[new_line_num] = line[1:]
                 new_line_num += 1
             elif line == '':  # Empty line (could be context)
@@ -751,18 +766,15 @@ def extract_function_diff_from_patch(patch: str, file_path: str, func_start: int
             continue
             
         # Parse hunk header
-        header_match = RE_HUNK_HEADER.match(lines[i])
-        if not header_match:
+        hunk_header = _parse_hunk_header(lines[i])
+        if not hunk_header:
             i += 1
             continue
             
-        original_start = int(header_match.group(1))
-        original_count = int(header_match.group(2) or 1)
-        new_start = int(header_match.group(3))
-        new_count = int(header_match.group(4) or 1)
+        new_start = hunk_header.new_start
         
         # Calculate hunk end
-        new_end = new_start + new_count - 1
+        new_end = new_start + hunk_header.new_count - 1
         
         # Check if this hunk overlaps with our function
         if new_start <= func_end and new_end >= func_start:
@@ -834,14 +846,14 @@ def extract_changed_lines(patch: str) -> Tuple[Set[int], Set[int]]:
             continue
             
         # Extract line numbers from header
-        header_match = RE_HUNK_HEADER.match(lines[i])
-        if not header_match:
+        hunk_header = _parse_hunk_header(lines[i])
+        if not hunk_header:
             i += 1
             continue
         
         # Get starting line numbers
-        orig_line = int(header_match.group(1))
-        new_line = int(header_match.group(3))
+        orig_line = hunk_header.original_start
+        new_line = hunk_header.new_start
         
         # Move past header
         i += 1
@@ -851,16 +863,14 @@ def extract_changed_lines(patch: str) -> Tuple[Set[int], Set[int]]:
             line = lines[i]
             
             # Fast character-based checking
-            if not line:  # Empty line
-                orig_line += 1
-                new_line += 1
-            elif line.startswith(' '):  # Context line
+            marker = line[:1]
+            if not marker or marker == ' ':  # Empty or context line
                 orig_line += 1
                 new_line += 1
-            elif line.startswith('-'):  # Removed line
+            elif marker == '-':  # Removed line
                 original_changed.add(orig_line)
                 orig_line += 1
-            elif line.startswith('+'):  # Added line
+            elif marker == '+':  # Added line
                 new_changed.add(new_line)
                 new_line += 1
             
@@ -869,6 +879,54 @@ def extract_changed_lines(patch: str) -> Tuple[Set[int], Set[int]]:
     return original_changed, new_changed
 
 
+def extract_content_from_patch(patch: str) -> Optional[str]:
+    """
+    Rebuild a file's content from a GitHub API patch that adds or removes the whole file.
+    
+    Such a patch is a single hunk starting at line 0 on one side, so it
+    already holds every line of the file and the content doesn't need to be
+    downloaded.
+    
+    Args:
+        patch: GitHub API patch (starts with @@)
+        
+    Returns:
+        The added (or removed) file content, or None if the patch doesn't
+        hold a complete file.
+    """
+    if not patch or not patch.startswith('@@'):
+        return None
+    
+    lines = patch.split('\n')
+    hunk_header = _parse_hunk_header(lines[0])
+    if not hunk_header:
+        return None
+    
+    # Only a file added from nothing or removed entirely is complete
+    if hunk_header.original_start == 0 and hunk_header.original_count == 0:
+        marker, line_count = '+', hunk_header.new_count
+    elif hunk_header.new_start == 0 and hunk_header.new_count == 0:
+        marker, line_count = '-', hunk_header.original_count
+    else:
+        return None
+    
+    content_lines = []
+    ends_with_newline = True
+    for line in lines[1:]:
+        if line[:1] == marker:
+            content_lines.append(line[1:])
+        elif line.startswith('\\'):  # "\ No newline at end of file"
+            ends_with_newline = False
+        else:
+            return None
+    
+    if not content_lines or len(content_lines) != line_count:
+        return None
+    
+    content = '\n'.join(content_lines)
+    return content + '\n' if ends_with_newline else content
+
+
 def create_simple_diff(content_old: str, content_new: str) -> str:
     """
     Create a simple line-by-line diff between two pieces of content.
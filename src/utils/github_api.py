@@ -1,11 +1,16 @@
 import re
 import os
-from typing import Dict, Tuple, Optional, Any
+import logging
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional, Any
 from github import Github, Auth
 from github.GithubException import GithubException
 from github.Commit import Commit
 from github.Repository import Repository
 
+# Set up logging
+logger = logging.getLogger(__name__)
+
 # Initialize GitHub client with authentication token if available
 github_token = os.environ.get('GITHUB_TOKEN')
 if github_token:
@@ -17,6 +22,20 @@ else:
     github_client = Github()
     print("WARNING: No GITHUB_TOKEN found. Using unauthenticated GitHub client (subject to rate limits)")
 
+# Pattern for GitHub commit URLs
+RE_GITHUB_COMMIT_URL = re.compile(r"https?://github\.com/([^/]+)/([^/]+)/commit/([^/]+)")
+
+# Full commit SHAs are immutable refs, so file contents at them can be cached
+RE_COMMIT_SHA = re.compile(r"^[0-9a-f]{40}$")
+FILE_CONTENT_CACHE_SIZE = 512
+
+# Number of files whose before/after blobs are requested per GraphQL query
+BULK_FETCH_BATCH_SIZE = 50
+
+# Blob lookups for the bulk fetch; each file gets a before and an after alias
+BLOB_FIELDS = "... on Blob { text isBinary isTruncated }"
+
+@lru_cache(maxsize=256)
 def parse_github_url(github_url: str) -> Tuple[str, str, str]:
     """
     Parse a GitHub URL to extract owner, repo, and commit SHA.
@@ -27,9 +46,7 @@ def parse_github_url(github_url: str) -> Tuple[str, str, str]:
     Returns:
         Tuple of (owner, repo_name, commit_sha)
     """
-    # Pattern for GitHub commit URLs
-    pattern = r"https?://github\.com/([^/]+)/([^/]+)/commit/([^/]+)"
-    match = re.match(pattern, github_url)
+    match = RE_GITHUB_COMMIT_URL.match(github_url)
     
     if not match:
         raise ValueError(f"Invalid GitHub commit URL: {github_url}")
@@ -37,10 +54,14 @@ def parse_github_url(github_url: str) -> Tuple[str, str, str]:
     owner, repo, commit_sha = match.groups()
     return owner, repo, commit_sha
 
+@lru_cache(maxsize=32)
 def get_repo(owner: str, repo: str) -> Repository:
     """
     Get a GitHub repository object.
     
+    Repository objects are cached, so fetching many files from the same
+    repository costs a single repository lookup.
+    
     Args:
         owner: Repository owner
         repo: Repository name
@@ -53,10 +74,14 @@ def get_repo(owner: str, repo: str) -> Repository:
     except GithubException as e:
         raise ValueError(f"Failed to get repository {owner}/{repo}: {e}")
 
+@lru_cache(maxsize=128)
 def get_commit(owner: str, repo: str, commit_sha: str) -> Commit:
     """
     Get a GitHub commit object.
     
+    Commits are immutable, so they are cached: the metadata analysis and the
+    per-file parent lookups of one commit share a single API request.
+    
     Args:
         owner: Repository owner
         repo: Repository name
@@ -126,6 +151,10 @@ def get_file_content(owner: str, repo: str, file_path: str, ref: str) -> Optiona
     """
     Get content of a file at a specific commit from GitHub API.
     
+    Contents at full commit SHAs are cached, so a file requested again at
+    the same commit (e.g. as the "after" of one commit and the "before" of
+    its child) is only downloaded once. Branch names are always refetched.
+    
     Args:
         owner: Repository owner
         repo: Repository name
@@ -135,6 +164,12 @@ def get_file_content(owner: str, repo: str, file_path: str, ref: str) -> Optiona
     Returns:
         Content of the file as string, or None if file doesn't exist
     """
+    if RE_COMMIT_SHA.match(ref):
+        return _get_file_content_at_commit(owner, repo, file_path, ref)
+    return _fetch_file_content(owner, repo, file_path, ref)
+
+def _fetch_file_content(owner: str, repo: str, file_path: str, ref: str) -> Optional[str]:
+    """Download the content of a file at a ref, or None if it doesn't exist."""
     try:
         repository = get_repo(owner, repo)
         content_file = repository.get_contents(file_path, ref=ref)
@@ -149,7 +184,9 @@ def get_file_content(owner: str, repo: str, file_path: str, ref: str) -> Optiona
             return None
         raise ValueError(f"Failed to get file content for {file_path} at {ref}: {e}")
 
-def get_file_content_before_after(owner: str, repo: str, commit_sha: str, file_path: str) -> Tuple[Optional[str], Optional[str]]:
+_get_file_content_at_commit = lru_cache(maxsize=FILE_CONTENT_CACHE_SIZE)(_fetch_file_content)
+
+def get_file_content_before_after(owner: str, repo: str, commit_sha: str, file_path: str, status: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
     """
     Get the content of a file before and after a commit.
     
@@ -158,21 +195,108 @@ def get_file_content_before_after(owner: str, repo: str, commit_sha: str, file_p
         repo: Repository name
         file_path: Path to file in the repository
         commit_sha: SHA of the commit
+        status: Optional file status in the commit. Added files have no
+            content before the commit and removed files none after it, so
+            that side is not fetched.
         
     Returns:
         Tuple of (content_before, content_after)
     """
-    commit = get_commit(owner, repo, commit_sha)
-    
-    # Get parent commit SHA
-    parent_sha = commit.parents[0].sha if commit.parents else None
-    
     # Get content after the commit
-    after_content = get_file_content(owner, repo, file_path, commit_sha)
+    after_content = None
+    if status != 'removed':
+        after_content = get_file_content(owner, repo, file_path, commit_sha)
     
     # Get content before the commit (if parent exists)
     before_content = None
-    if parent_sha:
-        before_content = get_file_content(owner, repo, file_path, parent_sha)
+    if status != 'added':
+        commit = get_commit(owner, repo, commit_sha)
+        
+        # Get parent commit SHA
+        parent_sha = commit.parents[0].sha if commit.parents else None
+        if parent_sha:
+            before_content = get_file_content(owner, repo, file_path, parent_sha)
+    
+    return before_content, after_content
+
+def get_file_contents_bulk(
+    owner: str,
+    repo: str,
+    commit_sha: str,
+    files: List[Tuple[str, Optional[str]]]
+) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """
+    Get the content of several files before and after a commit.
+    
+    Blobs are requested through the GraphQL API in batches of
+    BULK_FETCH_BATCH_SIZE files, instead of two REST requests per file.
+    The GraphQL API needs authentication, so without a GITHUB_TOKEN nothing
+    is fetched. Files that can't be returned as text (binary, truncated,
+    failed batch) are left out of the result; fetch those individually
+    with get_file_content_before_after.
+    
+    Args:
+        owner: Repository owner
+        repo: Repository name
+        commit_sha: SHA of the commit
+        files: List of (file_path, status) pairs, with status as accepted by
+            get_file_content_before_after
+        
+    Returns:
+        Dictionary mapping each fetched file path to (content_before, content_after)
+    """
+    contents = {}
+    
+    if github_token and files:
+        commit = get_commit(owner, repo, commit_sha)
+        parent_sha = commit.parents[0].sha if commit.parents else None
+        
+        for batch_start in range(0, len(files), BULK_FETCH_BATCH_SIZE):
+            batch = files[batch_start:batch_start + BULK_FETCH_BATCH_SIZE]
+            try:
+                contents.update(_fetch_blob_batch(owner, repo, commit_sha, parent_sha, batch))
+            except GithubException as e:
+                logger.warning("Bulk content fetch failed, files will be fetched one by one: %s", e)
+    
+    return contents
+
+def _fetch_blob_batch(
+    owner: str,
+    repo: str,
+    commit_sha: str,
+    parent_sha: Optional[str],
+    files: List[Tuple[str, Optional[str]]]
+) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """Fetch before/after blobs for a batch of files in one GraphQL query."""
+    variables = {'owner': owner, 'name': repo}
+    declarations = ['$owner: String!', '$name: String!']
+    selections = []
+    for idx, (file_path, status) in enumerate(files):
+        if status != 'added' and parent_sha:
+            variables[f'b{idx}'] = f"{parent_sha}:{file_path}"
+            declarations.append(f'$b{idx}: String!')
+            selections.append(f"b{idx}: object(expression: $b{idx}) {{ {BLOB_FIELDS} }}")
+        if status != 'removed':
+            variables[f'a{idx}'] = f"{commit_sha}:{file_path}"
+            declarations.append(f'$a{idx}: String!')
+            selections.append(f"a{idx}: object(expression: $a{idx}) {{ {BLOB_FIELDS} }}")
+    
+    query = (
+        f"query({', '.join(declarations)}) {{ "
+        f"repository(owner: $owner, name: $name) {{ {' '.join(selections)} }} }}"
+    )
+    _, data = github_client.requester.graphql_query(query, variables)
+    repository = data['data']['repository']
+    
+    contents = {}
+    for idx, (file_path, _) in enumerate(files):
+        # Missing paths come back as null and non-blob objects (directories)
+        # as empty objects; both mean there is no file content
+        before = repository.get(f'b{idx}') or None
+        after = repository.get(f'a{idx}') or None
+        # Leave files with binary or truncated blobs to the REST fallback
+        if any(blob and (blob['isBinary'] or blob['isTruncated']) for blob in (before, after)):
+            continue
+        contents[file_path] = (before['text'] if before else None, after['text'] if after else None)
     
-    return before_content, after_content 
\ No newline at end of file
+    return contents
\ No newline at end of file
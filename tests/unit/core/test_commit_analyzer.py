@@ -0,0 +1,47 @@
+"""
+Tests for commit_analyzer module.
+
+This module tests the selection of files to analyze in a commit.
+"""
+
+import logging
+from src.core.commit_analyzer import _limit_diff_lines
+from src.models import ModifiedFile
+
+
+def make_files(*changes):
+    """Create modified files with the given numbers of changed lines."""
+    return [
+        ModifiedFile(filename=f"file{i}.py", status="modified", additions=count,
+                     deletions=0, changes=count, language="Python")
+        for i, count in enumerate(changes)
+    ]
+
+
+class TestLimitDiffLines:
+    """Test limiting the changed lines analyzed in a commit."""
+
+    def test_under_limit(self):
+        """Test that all files are kept when the commit fits the budget."""
+        files = make_files(10, 20, 30)
+        assert _limit_diff_lines(files, 100) == files
+
+    def test_at_limit(self):
+        """Test that the budget is inclusive."""
+        files = make_files(10, 20, 30)
+        assert _limit_diff_lines(files, 60) == files
+        assert _limit_diff_lines(files, 59) == [files[0], files[1]]
+
+    def test_over_limit(self, caplog):
+        """Test that the largest files are skipped, keeping the original order."""
+        files = make_files(500, 10, 40, 20)
+
+        with caplog.at_level(logging.INFO, logger="src.core.commit_analyzer"):
+            selected = _limit_diff_lines(files, 100)
+
+        assert selected == [files[1], files[2], files[3]]
+        assert sum(f.changes for f in selected) == 70
+
+        # The skipped file is reported
+        assert "file0.py" in caplog.text
+        assert "file1.py" not in caplog.text
@@ -5,12 +5,16 @@ This module tests the detection of modified functions using diffs.
 """
 
 import pytest
+from unittest.mock import patch
 from src.core.function_detector import (
     create_modified_functions,
     detect_renamed_functions,
     calculate_function_similarity,
-    extract_functions_from_content
+    extract_functions_from_content,
+    clear_similarity_cache
 )
+from src.parsers.function_parser import clear_function_cache
+from src.parsers.tree_sitter_utils import parse_code
 from src.utils.diff_utils import parse_diff, FileDiff
 from src.models import FunctionChangeType, ModifiedFunction
 
@@ -156,8 +160,150 @@ class TestFunctionDetector:
         assert modified_functions[0].original_content is not None
         assert modified_functions[0].original_content.strip() == "def old_function():\n    print(\"Goodbye\")\n    return 0"
     
+    def test_unchanged_function_content_skipped(self):
+        """Test that functions whose content is unchanged are not reported."""
+        # Only the line endings of the first function change
+        original_content = "def same():\r\n    return 1\r\n\ndef changed():\n    return 2\n"
+        new_content = "def same():\n    return 1\n\ndef changed():\n    return 3\n"
+        patch = (
+            "@@ -1,5 +1,5 @@\n"
+            "-def same():\r\n"
+            "-    return 1\r\n"
+            "+def same():\n"
+            "+    return 1\n"
+            " \n"
+            " def changed():\n"
+            "-    return 2\n"
+            "+    return 3"
+        )
+        
+        modified_functions = create_modified_functions(
+            original_content, new_content, "python", "test.py", patch, "modified"
+        )
+        
+        assert [f.name for f in modified_functions] == ["changed"]
+        assert modified_functions[0].change_type == FunctionChangeType.MODIFIED
+
+    def test_generated_patch_without_api_patch(self):
+        """Test that changes are found from full contents when no patch is given."""
+        unchanged = "".join(f"def f{i}():\n    return {i}\n\n" for i in range(20))
+        original_content = unchanged + "def changed():\n    return 1\n\n" + unchanged.replace("def f", "def g")
+        new_content = unchanged + "def changed():\n    return 2\n\n" + unchanged.replace("def f", "def g")
+
+        modified_functions = create_modified_functions(
+            original_content, new_content, "python", "test.py", None, "modified"
+        )
+
+        assert [f.name for f in modified_functions] == ["changed"]
+        assert modified_functions[0].new_start == 61
+        assert modified_functions[0].changes == 2
+        assert create_modified_functions(
+            original_content, original_content, "python", "test.py", None, "modified"
+        ) == []
+
+    def test_generated_patch_matches_full_diff(self):
+        """Test that a change before brace-only lines is counted as in a full-file diff."""
+        original_content = "package main\n\n" + "".join(
+            f"func f{i}(x int) int {{\n\tif x > {i} {{\n\t\treturn x\n\t}}\n\treturn x\n}}\n\n"
+            for i in range(30)
+        )
+        new_content = original_content.replace(
+            "\treturn x\n}\n\nfunc f1(", "\treturn x\n}\n\n}\nfunc f1(", 1
+        ).replace(
+            "\t\treturn x\n\t}\n\treturn x\n}\n\nfunc f29(",
+            "\t\treturn x\n\t\tx *= 2\n\t}\n\treturn x\n}\n\nfunc f29("
+        )
+
+        modified_functions = create_modified_functions(
+            original_content, new_content, "go", "main.go", None, "modified"
+        )
+
+        assert [(f.name, f.changes) for f in modified_functions] == [("f28", 1)]
+
+    def test_parse_tree_not_shared_with_incremental_parse(self):
+        """Test that incremental parsing doesn't edit trees held by other callers."""
+        clear_function_cache()
+        shared_tree = parse_code(ORIGINAL_CODE, "python")
+        shared_root = str(shared_tree.root_node)
+        
+        modified_functions = create_modified_functions(
+            ORIGINAL_CODE, NEW_CODE, "python", "sample.py", CODE_PATCH, "modified"
+        )
+        
+        assert len(modified_functions) == 4
+        assert not shared_tree.root_node.has_changes
+        assert str(shared_tree.root_node) == shared_root
     
+    def test_same_name_functions_match_nearest(self):
+        """Test that same-named functions are matched to the closest original."""
+        original_content = (
+            "class A:\n"
+            "    def run(self):\n"
+            "        return 1\n"
+            "\n"
+            "class B:\n"
+            "    def run(self):\n"
+            "        return 2\n"
+        )
+        new_content = original_content.replace("return 2", "return 3")
+        patch = (
+            "@@ -5,3 +5,3 @@\n"
+            " class B:\n"
+            "     def run(self):\n"
+            "-        return 2\n"
+            "+        return 3\n"
+        )
         
+        modified_functions = create_modified_functions(
+            original_content, new_content, "python", "classes.py", patch, "modified"
+        )
+        
+        assert len(modified_functions) == 1
+        assert modified_functions[0].change_type == FunctionChangeType.MODIFIED
+        assert modified_functions[0].original_start == 6
+        assert "return 2" in modified_functions[0].original_content
+
+    def test_same_name_functions_match_after_line_shift(self):
+        """Test that same-named functions are matched when lines above them change."""
+        original_content = (
+            "class A:\n"
+            "    def run(self):\n"
+            "        return 1\n"
+            "\n"
+            "class B:\n"
+            "    def run(self):\n"
+            "        return 2\n"
+        )
+        new_content = (
+            "import a\n"
+            "import b\n"
+            "import c\n"
+            "import d\n"
+            "import e\n"
+        ) + original_content.replace("return 1", "return 3")
+        patch = (
+            "@@ -1,3 +1,8 @@\n"
+            "+import a\n"
+            "+import b\n"
+            "+import c\n"
+            "+import d\n"
+            "+import e\n"
+            " class A:\n"
+            "     def run(self):\n"
+            "-        return 1\n"
+            "+        return 3\n"
+        )
+
+        modified_functions = create_modified_functions(
+            original_content, new_content, "python", "classes.py", patch, "modified"
+        )
+
+        assert len(modified_functions) == 1
+        assert modified_functions[0].change_type == FunctionChangeType.MODIFIED
+        assert modified_functions[0].original_start == 2
+        assert modified_functions[0].new_start == 7
+        assert "return 1" in modified_functions[0].original_content
+
     def test_calculate_function_similarity(self):
         """Test calculation of function similarity."""
         original_content = """def function(a, b):
@@ -185,6 +331,12 @@ class TestFunctionDetector:
         similarity = calculate_function_similarity(original_content, different_content)
         assert similarity < 0.6
         
+        # Long renamed functions stay similar; common characters aren't junk
+        long_content = "def function(a, b):\n" + "".join(f"    res = res + a * {i}\n" for i in range(30))
+        long_renamed = long_content.replace("function", "renamed").replace("res", "result")
+        similarity = calculate_function_similarity(long_content, long_renamed)
+        assert similarity >= 0.7
+        
     def test_extract_functions_from_content(self):
         """Test extracting functions from file content."""
         content = """def function1():
@@ -244,4 +396,31 @@ class MyClass:
         assert functions[0].name == "new_func"
         assert functions[0].original_name == "old_func"
         assert functions[0].original_content == old_func_content
-        assert functions[0].new_content == new_func_content 
\ No newline at end of file
+        assert functions[0].new_content == new_func_content 
+    
+    def test_rename_similarity_cached(self):
+        """Test that rename similarity scores are reused for the same contents."""
+        def make_functions():
+            return [
+                ModifiedFunction(
+                    name="new_func", file="test.py", type="function",
+                    change_type=FunctionChangeType.ADDED, new_start=1, new_end=2,
+                    new_content="def new_func():\n    return compute(1, 2)\n"
+                ),
+                ModifiedFunction(
+                    name="old_func", file="test.py", type="function",
+                    change_type=FunctionChangeType.REMOVED, original_start=1, original_end=2,
+                    original_content="def old_func():\n    return compute(1, 2)\n"
+                )
+            ]
+        
+        clear_similarity_cache()
+        first = make_functions()
+        detect_renamed_functions(first)
+        
+        # The second run must not score the pair again
+        second = make_functions()
+        with patch('src.core.function_detector._bounded_similarity', side_effect=AssertionError):
+            detect_renamed_functions(second)
+        assert second == first
+        assert second[0].change_type == FunctionChangeType.RENAMED
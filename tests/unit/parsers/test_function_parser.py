@@ -11,6 +11,7 @@ from src.parsers.function_parser import (
     parse_functions,
     get_function_at_line,
     extract_function_content,
+    clear_function_cache,
     FUNCTION_QUERIES
 )
 
@@ -99,6 +100,18 @@ class TestFunctionParser:
         functions = parse_functions(None, "python")
         assert functions == []
     
+    def test_parse_functions_cached(self):
+        """Test that cached results are not shared with callers."""
+        clear_function_cache()
+        code = "def add(a, b):\n    return a + b\n"
+        functions = parse_functions(code, "python")
+        expected = [dict(f, parameters=list(f['parameters'])) for f in functions]
+        functions[0]['name'] = "changed"
+        functions[0]['parameters'].append("c")
+        
+        # A cache hit returns the original, unmodified result
+        assert parse_functions(code, "python") == expected
+    
     def test_get_function_at_line(self):
         """Test finding a function containing a specific line."""
         code = read_sample(PYTHON_SAMPLES["functions_with_line_numbers"])
@@ -139,6 +152,10 @@ class TestFunctionParser:
         assert "print(3)" in content2
         assert "print(4)" in content2
         assert "print(1)" not in content2
+        
+        # Pre-split lines give the same result
+        lines = code.splitlines()
+        assert extract_function_content(code, func2['start_line'], func2['end_line'], lines) == content2
     
     def test_extract_function_invalid_content(self):
         """Test extracting function content with invalid inputs."""
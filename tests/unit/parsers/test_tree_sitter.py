@@ -13,6 +13,7 @@ from src.parsers.tree_sitter_utils import (
     get_supported_languages,
     clear_caches,
     parse_code,
+    edit_tree,
     SUPPORTED_LANGUAGES
 )
 
@@ -90,6 +91,46 @@ class TestTreeSitterUtils:
         assert tree.root_node.type == "program"
         assert tree.root_node.child_count > 0
 
+    def test_parse_code_returns_new_tree(self):
+        """Test that each parse returns a tree owned by the caller."""
+        code = "def hello():\n    return 1"
+        tree1 = parse_code(code, "python")
+        tree2 = parse_code(code.encode('utf8'), "python")
+        # Trees aren't shared, so editing one can't affect another caller
+        assert tree1 is not tree2
+        assert str(tree1.root_node) == str(tree2.root_node)
+
+    def test_parse_code_incremental(self):
+        """Test reparsing with an edited old tree."""
+        old_code = "def hello():\n    return 1\n"
+        new_code = "def hello():\n    return 12\n"
+        other_tree = parse_code(old_code, "python")
+        old_tree = parse_code(old_code, "python")
+        old_tree.edit(
+            start_byte=24, old_end_byte=24, new_end_byte=25,
+            start_point=(1, 12), old_end_point=(1, 12), new_end_point=(1, 13)
+        )
+        tree = parse_code(new_code, "python", old_tree=old_tree)
+        assert tree.root_node.text.decode('utf8') == new_code
+        
+        # Editing one caller's tree leaves other trees of the same code untouched
+        assert not other_tree.root_node.has_changes
+
+    def test_edit_tree(self):
+        """Test editing a tree with line edits for incremental reparsing."""
+        old_code = b"def a():\n    return 1\n\ndef b():\n    return 2\n"
+        new_code = b"def a():\n    x = 0\n    return 1\n\ndef b():\n    return 3"
+        # Line 2 gains a line before it, line 5 is replaced
+        tree = edit_tree(parse_code(old_code, "python"), old_code, new_code, [(1, 0, 1, 1), (4, 1, 5, 1)])
+        assert tree is not None
+        incremental = parse_code(new_code, "python", old_tree=tree)
+        assert str(incremental.root_node) == str(parse_code(new_code, "python").root_node)
+        
+        # Edits that don't cover every changed line are rejected
+        old_tree = parse_code(old_code, "python")
+        assert edit_tree(old_tree, old_code, new_code, [(1, 0, 1, 1)]) is None
+        assert not old_tree.root_node.has_changes
+
     def test_parse_code_invalid_language(self):
         """Test that parsing code with an invalid language raises an error."""
         with pytest.raises(ValueError, match="Language not supported"):
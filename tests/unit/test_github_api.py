@@ -1,5 +1,8 @@
 import pytest
-from src.utils.github_api import parse_github_url, get_commit_data, get_file_content
+from unittest import mock
+from github.GithubException import GithubException
+from src.utils import github_api
+from src.utils.github_api import parse_github_url, get_commit_data, get_file_content, get_file_contents_bulk
 
 class TestGitHubAPI:
     """Tests for the GitHub API utility functions."""
@@ -77,4 +80,63 @@ class TestGitHubAPI:
             "python", "cpython", "this-file-does-not-exist.txt", 
             "d783d7b51d31db568de6b3438f4e805acff663da"
         )
-        assert content is None 
\ No newline at end of file
+        assert content is None 
+    
+    def test_get_file_contents_bulk(self):
+        """Test fetching before/after contents of several files in one query."""
+        commit_sha = "b" * 40
+        parent_sha = "a" * 40
+        commit = mock.Mock(parents=[mock.Mock(sha=parent_sha)])
+        repository = {
+            # modified.py: both versions
+            'b0': {'text': "old\n", 'isBinary': False, 'isTruncated': False},
+            'a0': {'text': "new\n", 'isBinary': False, 'isTruncated': False},
+            # added.py: no blob before is requested
+            'a1': {'text': "added\n", 'isBinary': False, 'isTruncated': False},
+            # missing.py: path not found at either commit
+            'b2': None,
+            'a2': None,
+            # image.png: binary blobs are left to the REST fallback
+            'b3': {'text': None, 'isBinary': True, 'isTruncated': False},
+            'a3': {'text': None, 'isBinary': True, 'isTruncated': False},
+        }
+        files = [
+            ("modified.py", "modified"),
+            ("added.py", "added"),
+            ("missing.py", "modified"),
+            ("image.png", "modified"),
+        ]
+        
+        with mock.patch.object(github_api, 'github_token', "token"), \
+             mock.patch.object(github_api, 'get_commit', return_value=commit), \
+             mock.patch.object(github_api.github_client.requester, 'graphql_query',
+                               return_value=({}, {'data': {'repository': repository}})) as graphql_query:
+            contents = get_file_contents_bulk("owner", "repo", commit_sha, files)
+        
+        assert contents == {
+            "modified.py": ("old\n", "new\n"),
+            "added.py": (None, "added\n"),
+            "missing.py": (None, None),
+        }
+        
+        # Each alias looks up the file at the right commit
+        graphql_query.assert_called_once()
+        variables = graphql_query.call_args[0][1]
+        assert variables['b0'] == f"{parent_sha}:modified.py"
+        assert variables['a0'] == f"{commit_sha}:modified.py"
+        assert 'b1' not in variables
+        assert variables['a1'] == f"{commit_sha}:added.py"
+    
+    def test_get_file_contents_bulk_error(self):
+        """Test that a failed bulk query leaves the files to be fetched one by one."""
+        commit = mock.Mock(parents=[mock.Mock(sha="a" * 40)])
+        
+        with mock.patch.object(github_api, 'github_token', "token"), \
+             mock.patch.object(github_api, 'get_commit', return_value=commit), \
+             mock.patch.object(github_api.github_client.requester, 'graphql_query',
+                               side_effect=GithubException(502, "Bad Gateway", None)), \
+             mock.patch.object(github_api.logger, 'warning') as warning:
+            contents = get_file_contents_bulk("owner", "repo", "b" * 40, [("file.py", "modified")])
+        
+        assert contents == {}
+        warning.assert_called_once()
@@ -7,11 +7,14 @@ This module tests the parsing of unified diffs and line number mapping.
 import pytest
 from src.utils.diff_utils import (
     parse_diff,
+    iter_file_diffs,
     get_changed_line_numbers,
     map_original_to_new_line,
     map_new_to_original_line,
     generate_line_map,
     extract_function_diff,
+    index_function_diffs,
+    extract_content_from_patch,
     FileDiff
 )
 
@@ -178,6 +181,16 @@ class TestDiffUtils:
             assert line in result[0].new_changes
         assert list(result[0].new_changes.keys()) == [17] + list(range(28, 36))
         
+    def test_iter_file_diffs(self):
+        """Test that lazy parsing yields the same file diffs as parse_diff."""
+        combined = SIMPLE_DIFF + "\n" + NEW_FILE_DIFF
+        file_diffs = iter_file_diffs(combined)
+        
+        first = next(file_diffs)
+        assert first.new_file == 'b/sample.py'
+        assert [first] + list(file_diffs) == parse_diff(combined)
+        assert list(iter_file_diffs("")) == []
+
 
     def test_parse_new_file(self):
         """Test parsing a diff for a new file."""
@@ -306,4 +319,24 @@ class TestDiffUtils:
 
         
         func_diff = extract_function_diff(file_diff, 12, 14)  # func2, no changes
-        assert func_diff is None 
\ No newline at end of file
+        assert func_diff is None 
+
+        # The index only speeds up the lookups, results are unchanged
+        index = index_function_diffs(file_diff)
+        assert index is not None
+        for func_start, func_end in [(28, 31), (12, 14), (1, 200), (500, 510)]:
+            assert (extract_function_diff(file_diff, func_start, func_end, index)
+                    == extract_function_diff(file_diff, func_start, func_end))
+    
+    def test_extract_content_from_patch(self):
+        """Test rebuilding whole-file content from added/removed file patches."""
+        added_patch = "@@ -0,0 +1,2 @@\n+def new():\n+    return 1"
+        assert extract_content_from_patch(added_patch) == "def new():\n    return 1\n"
+        
+        removed_patch = "@@ -1,2 +0,0 @@\n-def old():\n-    return 0\n\\ No newline at end of file"
+        assert extract_content_from_patch(removed_patch) == "def old():\n    return 0"
+        
+        # Patches of modified files don't hold the whole file
+        modified_patch = "@@ -1,2 +1,2 @@\n def f():\n-    return 0\n+    return 1"
+        assert extract_content_from_patch(modified_patch) is None
+        assert extract_content_from_patch(None) is None